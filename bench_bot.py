@@ -0,0 +1,194 @@
+import asyncio
+import os
+from collections import defaultdict
+from contextvars import ContextVar
+from time import perf_counter, time
+
+import fake_telegram
+
+
+# End-to-end load test of the real dispatcher from bot/__init__.py: synthetic updates are fed straight into
+# dp.feed_raw_update (the same path polling and the webhook take), the bot talks to fake_telegram.py, and Mongo is
+# either mongomock (mongomock and mongomock-motor have to be installed) or a local mongod from DB_HOST.
+# Every virtual user plays the scenarios in order, users run concurrently. Reports updates/s,
+# p50/p99 latency of feed_update and Mongo operations per update for every scenario.
+# With a real mongod point DB_NAME at an empty database, the fixtures and signups expect fresh ids.
+
+ADMIN_ID = 1
+USER_ID_BASE = 10**9
+TEAM_ID_BASE = 2 * 10**9
+
+
+def _user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": "user", "username": f"user{user_id}"}
+
+def _message(update_id: int, user_id: int, text: str) -> dict:
+    return {
+        "message_id": update_id,
+        "date": int(time()),
+        "chat": {"id": user_id, "type": "private", "username": f"user{user_id}", "first_name": "user"},
+        "from": _user(user_id),
+        "text": text
+    }
+
+def message_update(update_id: int, user_id: int, text: str) -> dict:
+    return {"update_id": update_id, "message": _message(update_id, user_id, text)}
+
+def callback_update(update_id: int, user_id: int, data: str, text: str = "Нагадування") -> dict:
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "message": _message(update_id, user_id, text),
+            "data": data
+        }
+    }
+
+
+def _use_mongomock():
+    # has to run before anything imports motor/pymongo clients
+    import mongomock
+    import mongomock_motor
+    import motor.motor_asyncio
+    import pymongo
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    pymongo.MongoClient = mongomock.MongoClient
+
+
+async def bench(users: int = 200, teams: int = 500, pages: int = 5, mongomock: bool = True):
+    os.environ.setdefault("BOT_TOKEN", "123456:bench")
+    os.environ.setdefault("DB_HOST", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "bench")
+    os.environ.setdefault("BOT_API_URL", "http://127.0.0.1:8081")
+    if mongomock:
+        _use_mongomock()
+
+    from bot import bot, Bot, dp
+    from bot.db import ensure_indexes
+    from bot.metrics import mongo_seconds
+    from bot.models import User, Team, Reminder
+    from bot.models.enums import Role
+    from bot.scheduler import scheduler
+    from bot.search import team_index
+    from bot.utils import _background_tasks
+
+    fake, runner = await fake_telegram.start()
+    scheduler.ctx.add_instance(bot, Bot)
+    await ensure_indexes()
+    await team_index.load()
+    scheduler.start()
+
+    # fixtures: an admin, teams to page through, and registered users with a team for the menu/reminder scenarios
+    await User.create(ADMIN_ID, Role.ADMIN, if_exists="return")
+    for i in range(teams):
+        if not await Team.get(TEAM_ID_BASE + i):
+            await Team.create(TEAM_ID_BASE + i, f"Bench team {i}")
+    cursors = []
+    after = None
+    for _ in range(pages):
+        page, _, has_next = await Team.find_page(after=after)
+        if not has_next:
+            break
+        after = (page[-1].created_at, page[-1].id)
+        cursors.append(f"next:{page[-1].created_at!r}:{page[-1].id}")
+
+    update_ids = iter(range(1, 10**9))
+
+    def signup(user_id: int) -> list:
+        return [
+            message_update(next(update_ids), user_id, "/start"),
+            message_update(next(update_ids), user_id, f"Signup {user_id}"),
+            callback_update(next(update_ids), user_id, "send", "Надіслати запит?")
+        ]
+
+    def rename(user_id: int) -> list:
+        return [
+            message_update(next(update_ids), user_id, "Команда"),
+            message_update(next(update_ids), user_id, "Змінити назву"),
+            message_update(next(update_ids), user_id, f"Renamed {user_id} {time()}")
+        ]
+
+    def enable_reminders(user_id: int) -> list:
+        return [callback_update(next(update_ids), user_id, "enrem")]
+
+    def reminder_answers(user_id: int) -> list:
+        return [
+            callback_update(next(update_ids), user_id, "update:no:MINOR"),
+            callback_update(next(update_ids), user_id, "update:yes:MAJOR")
+        ]
+
+    def confirmation_answer(user_id: int) -> list:
+        return [callback_update(next(update_ids), user_id, "confirmupd:yes:MAJOR")]
+
+    async def fire_reminders(user_id: int):
+        # what the reminder job does before the user gets the buttons, minus the message
+        for reminder in await (await User.get(user_id)).get_reminders({"job_id": 1, "type": 1, "remind_at": 1}):
+            await Reminder.pop(reminder.id)
+            if reminder.job_id and scheduler.get_job(reminder.job_id):
+                scheduler.remove_job(reminder.job_id)
+
+    def admin_paging(_: int) -> list:
+        return [message_update(next(update_ids), ADMIN_ID, "Команди")] + \
+            [callback_update(next(update_ids), ADMIN_ID, cursor, "Команди") for cursor in cursors]
+
+    latencies = defaultdict(list)
+    mongo_ops = defaultdict(int)
+
+    # every db operation is attributed to the scenario whose update (or a task spawned by it) made it
+    scenario = ContextVar("scenario", default=None)
+    observe = mongo_seconds.observe
+    def count_and_observe(seconds: float, *labels):
+        if scenario.get():
+            mongo_ops[scenario.get()] += 1
+        observe(seconds, *labels)
+    mongo_seconds.observe = count_and_observe
+
+    async def play(name: str, updates: list):
+        scenario.set(name)
+        for update in updates:
+            start = perf_counter()
+            await dp.feed_raw_update(bot, update)
+            latencies[name].append(perf_counter() - start)
+        scenario.set(None)
+
+    async def play_user(i: int):
+        user_id = USER_ID_BASE + i
+        await play("signup", signup(user_id))
+        # approval is an admin action with its own flow, here the team is just created
+        await Team.create(user_id, f"Signup {user_id}")
+        await play("rename", rename(user_id))
+        await play("reminders", enable_reminders(user_id))
+        await fire_reminders(user_id)
+        await play("reminders", reminder_answers(user_id))
+        await fire_reminders(user_id)
+        await play("reminders", confirmation_answer(user_id))
+
+    start = perf_counter()
+    await asyncio.gather(*(play_user(i) for i in range(users)), play("admin_paging", admin_paging(0)))
+    elapsed = perf_counter() - start
+    # admin notifications are sent in the background, at most 1 msg/s per admin chat (bot.sender)
+    if _background_tasks:
+        await asyncio.wait(_background_tasks)
+    drained = perf_counter() - start
+    total_ops = sum(mongo_ops.values())
+
+    scheduler.shutdown()
+    await asyncio.sleep(0)
+    await bot.session.close()
+    await runner.cleanup()
+
+    total = sum(len(values) for values in latencies.values())
+    print(f'UPDATES: {total} in {elapsed:.2f}s, {total / elapsed:.0f} updates/s, {total_ops / total:.1f} mongo ops/update')
+    for name, values in latencies.items():
+        values.sort()
+        p50 = values[len(values) // 2] * 1000
+        p99 = values[min(len(values) - 1, int(len(values) * 0.99))] * 1000
+        print(f'{name}: {len(values)} updates, p50 {p50:.1f}ms, p99 {p99:.1f}ms, {mongo_ops[name] / len(values):.1f} mongo ops/update')
+    print(f'NOTIFICATIONS SENT: {drained:.2f}s after the start')
+    print('API CALLS:', dict(fake.calls))
+
+
+if __name__ == '__main__':
+    asyncio.run(bench())
@@ -0,0 +1,72 @@
+import asyncio
+import statistics
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.jobstores.mongodb import MongoDBJobStore
+from pymongo import MongoClient
+
+from bot.jobstore import AsyncMongoDBJobStore
+
+
+# Measures how long a "handler" waits for the event loop while other tasks churn reminder jobs
+# (add -> reschedule -> remove, like bot.jobs.reminder and Reminder.reschedule/delete do).
+# Run against a real mongod, the point is the network round trips.
+
+
+def noop():
+    pass
+
+
+async def churn(scheduler: AsyncIOScheduler, worker: int, iterations: int):
+    for i in range(iterations):
+        run_date = datetime.now() + timedelta(days=90)
+        job = scheduler.add_job(noop, "date", run_date=run_date, id=f"bench-{worker}-{i}")
+        job.reschedule(trigger="date", run_date=run_date + timedelta(days=1))
+        job.remove()
+        await asyncio.sleep(0)
+
+
+async def handler_latency(stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = perf_counter()
+        await asyncio.sleep(0.001)
+        latencies.append(perf_counter() - start - 0.001)
+
+
+async def measure(jobstore, workers: int, iterations: int) -> dict:
+    scheduler = AsyncIOScheduler(jobstores={"default": jobstore})
+    scheduler.start()
+
+    stop = asyncio.Event()
+    latencies = []
+    probe = asyncio.create_task(handler_latency(stop, latencies))
+    start = perf_counter()
+    await asyncio.gather(*(churn(scheduler, w, iterations) for w in range(workers)))
+    elapsed = perf_counter() - start
+    stop.set()
+    await probe
+    scheduler.shutdown()
+
+    latencies.sort()
+    return {
+        "ops/s": round(workers * iterations * 3 / elapsed),
+        "p50 ms": round(statistics.median(latencies) * 1000, 2),
+        "p99 ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "max ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+async def bench(uri: str, workers: int = 20, iterations: int = 50):
+    client = MongoClient(uri)
+    for name, jobstore in [
+        ("MongoDBJobStore", MongoDBJobStore(database="apscheduler_bench", client=client)),
+        ("AsyncMongoDBJobStore", AsyncMongoDBJobStore(database="apscheduler_bench", host=uri)),
+    ]:
+        print(name, await measure(jobstore, workers, iterations))
+    client.drop_database("apscheduler_bench")
+
+
+if __name__ == '__main__':
+    asyncio.run(bench('mongodb://localhost:27018'))
@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from pymongo import MongoClient
+
+from bot.jobstore import AsyncMongoDBJobStore
+
+
+# Measures how fast the scheduler starts on a big job store: how long scheduler.start() blocks, when all
+# jobs are in memory and how long the event loop (i.e. update handling) stalls meanwhile, with the jobs
+# loaded eagerly in start() and in the background. Run against a real mongod, or with mongomock=True.
+
+
+def noop(user_id: int, type: int):
+    pass
+
+
+async def loop_lag(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(perf_counter() - start - 0.001)
+
+
+def seed(client: MongoClient, jobs: int):
+    # the same documents the bot writes, reminders spread over the next 90 days
+    jobstore = AsyncMongoDBJobStore(database="apscheduler_bench", client=client, background_load=False)
+    scheduler = AsyncIOScheduler(jobstores={"default": jobstore})
+    scheduler.start(paused=True)
+    now = datetime.now()
+    for i in range(jobs):
+        scheduler.add_job(
+            noop, "date", run_date=now + timedelta(days=90 * i / jobs + 1), id=f"bench-{i}",
+            kwargs={"user_id": 10**9 + i, "type": i % 4}
+        )
+    scheduler.shutdown()
+
+
+async def measure(client: MongoClient, background_load: bool) -> dict:
+    jobstore = AsyncMongoDBJobStore(database="apscheduler_bench", client=client, background_load=background_load)
+    scheduler = AsyncIOScheduler(jobstores={"default": jobstore})
+
+    stop = asyncio.Event()
+    lags = []
+    probe = asyncio.create_task(loop_lag(stop, lags))
+    await asyncio.sleep(0)
+
+    start = perf_counter()
+    scheduler.start()
+    started = perf_counter() - start
+    await jobstore.wait_loaded()
+    loaded = perf_counter() - start
+    jobs = len(jobstore)
+
+    stop.set()
+    await probe
+    scheduler.shutdown()
+    # the job store is shut down with call_soon_threadsafe
+    await asyncio.sleep(0)
+    return {
+        "start() ms": round(started * 1000, 1),
+        "loaded ms": round(loaded * 1000, 1),
+        "max loop lag ms": round(max(lags, default=started) * 1000, 1),
+        "jobs": jobs
+    }
+
+
+async def bench(uri: str, jobs: int = 10_000, mongomock: bool = False):
+    if mongomock:
+        import mongomock as _mongomock
+        client = _mongomock.MongoClient()
+    else:
+        client = MongoClient(uri)
+    client.drop_database("apscheduler_bench")
+    seed(client, jobs)
+
+    for name, background_load in [("eager", False), ("background", True)]:
+        print(name, await measure(client, background_load))
+    client.drop_database("apscheduler_bench")
+
+
+if __name__ == '__main__':
+    asyncio.run(bench('mongodb://localhost:27018'))
@@ -0,0 +1,52 @@
+import asyncio
+from time import perf_counter, time
+
+import aiohttp
+
+import fake_telegram
+
+
+# Webhook throughput: POSTs synthetic updates to a bot running with
+#   BOT_MODE=webhook BOT_API_URL=http://127.0.0.1:8081 WEBHOOK_SECRET=bench
+# and counts the bot's replies on the fake Bot API. The updates come from unregistered users,
+# so each /menu costs GlobalMiddleware's user lookup and one sendMessage.
+
+
+def make_update(update_id: int, user_id: int) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": "user", "username": f"user{user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time()),
+            "chat": {"id": user_id, "type": "private", "username": user["username"], "first_name": "user"},
+            "from": user,
+            "text": "/menu"
+        }
+    }
+
+
+async def bench(webhook_url: str, secret: str, updates: int = 5000, connections: int = 40):
+    fake, runner = await fake_telegram.start()
+    semaphore = asyncio.Semaphore(connections)
+
+    async with aiohttp.ClientSession(headers={"X-Telegram-Bot-Api-Secret-Token": secret}) as session:
+        async def post(i: int):
+            async with semaphore:
+                async with session.post(webhook_url, json=make_update(i, 10**9 + i)) as response:
+                    response.raise_for_status()
+
+        start = perf_counter()
+        await asyncio.gather(*(post(i) for i in range(updates)))
+        posted = perf_counter() - start
+        await fake.wait_for("sendMessage", updates)
+        handled = perf_counter() - start
+
+    await runner.cleanup()
+    print(f'POSTED: {updates / posted:.0f} updates/s')
+    print(f'HANDLED: {updates / handled:.0f} updates/s')
+    print('API CALLS:', dict(fake.calls))
+
+
+if __name__ == '__main__':
+    asyncio.run(bench('http://localhost:8080/webhook', 'bench'))
@@ -1,17 +1,7 @@
-from aiogram import Bot, Dispatcher
-from aiogram.enums import ParseMode
-
-from bot.config import Config
-from bot.routers import user_router, admin_router
-from bot.middlewares import GlobalMiddleware
-
-
-bot = Bot(Config.BOT_TOKEN, parse_mode=ParseMode.HTML)
-
-dp = Dispatcher()
-
-dp.message.middleware(GlobalMiddleware())
-dp.callback_query.middleware(GlobalMiddleware())
-
-dp.include_router(user_router)
-dp.include_router(admin_router)
+# The bot and the dispatcher are built in bot.app, imported on first access (`from bot import bot, dp`):
+# scripts that only need bot.config, bot.db or bot.jobstore don't pay for aiogram and the routers.
+def __getattr__(name: str):
+    if name in ("bot", "Bot", "dp", "session"):
+        from bot import app
+        return getattr(app, name)
+    raise AttributeError(f"module 'bot' has no attribute '{name}'")
@@ -0,0 +1,31 @@
+from aiogram import Bot, Dispatcher
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.enums import ParseMode
+
+from bot.config import Config
+from bot.db import db as mongo_db
+from bot.storage import MongoStorage
+from bot.templates import TemplateSession
+from bot.routers import user_router, admin_router
+from bot.middlewares import GlobalMiddleware, TimingMiddleware, SendQueueMiddleware, TelegramTimingMiddleware
+
+
+session = TemplateSession(api=TelegramAPIServer.from_base(Config.BOT_API_URL)) if Config.BOT_API_URL else TemplateSession()
+bot = Bot(Config.BOT_TOKEN, session=session, parse_mode=ParseMode.HTML)
+# the queue is outside, so the API timing doesn't include the wait for a rate limit slot
+bot.session.middleware(SendQueueMiddleware())
+bot.session.middleware(TelegramTimingMiddleware())
+
+dp = Dispatcher(storage=MongoStorage(mongo_db.fsm))
+
+# registered first, so it also times GlobalMiddleware
+dp.message.middleware(TimingMiddleware())
+dp.callback_query.middleware(TimingMiddleware())
+dp.inline_query.middleware(TimingMiddleware())
+
+dp.message.middleware(GlobalMiddleware())
+dp.callback_query.middleware(GlobalMiddleware())
+dp.inline_query.middleware(GlobalMiddleware())
+
+dp.include_router(user_router)
+dp.include_router(admin_router)
@@ -0,0 +1,161 @@
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+from bson import ObjectId
+from datetime import datetime
+from time import monotonic, time
+import asyncio
+
+from bot.config import Config
+from bot.keyboards.admin import broadcast_progress_kb
+from bot.models import Team, Broadcast
+from bot.models.enums import BroadcastStatus
+from bot.scheduler import scheduler
+from bot.sender import send_priority, Priority
+from bot.utils import delete_teams
+
+
+BROADCAST_WATCHDOG_JOB_ID = "broadcast-watchdog"
+
+_running: dict[ObjectId, asyncio.Task] = {}  # broadcasts sent by this process, also strong refs to their tasks
+
+_STATUS_TEXT = {
+    BroadcastStatus.RUNNING: "триває...",
+    BroadcastStatus.DONE: "завершена",
+    BroadcastStatus.CANCELLED: "зупинена"
+}
+
+
+class _BatchResult:
+
+    __slots__ = ("sent", "failed", "blocked")
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.blocked: list[int] = []
+
+
+def render_progress(broadcast: Broadcast) -> str:
+    done = broadcast.sent + broadcast.failed + len(broadcast.blocked)
+    return f"📣 Розсилка {_STATUS_TEXT[broadcast.status]} \n\n" \
+           f"Оброблено: {done}/{max(done, broadcast.total)} \n" \
+           f"✅ Надіслано: {broadcast.sent} \n" \
+           f"⛔️ Заблокували бота: {len(broadcast.blocked)} \n" \
+           f"⚠️ Помилки: {broadcast.failed}"
+
+async def _show_progress(bot: Bot, broadcast: Broadcast):
+    reply_markup = broadcast_progress_kb(str(broadcast.id)) if broadcast.status == BroadcastStatus.RUNNING else None
+    try:
+        with send_priority(Priority.NOTIFY):
+            await bot.edit_message_text(
+                render_progress(broadcast),
+                chat_id=broadcast.admin_id,
+                message_id=broadcast.message_id,
+                reply_markup=reply_markup
+            )
+    except Exception:
+        return  # e.g. the admin deleted the message, the broadcast goes on
+
+
+async def _sender(bot: Bot, text: str, queue: asyncio.Queue, result: list[_BatchResult]):
+    # paced by the send queue (bot.sender); result[0] is the current batch
+    while True:
+        chat_id = await queue.get()
+        try:
+            await bot.send_message(chat_id, text, disable_web_page_preview=True)
+            result[0].sent += 1
+        except TelegramForbiddenError:
+            result[0].blocked.append(chat_id)
+        except Exception:
+            result[0].failed += 1
+        finally:
+            queue.task_done()
+
+async def _heartbeat(broadcast: Broadcast):
+    while True:
+        await asyncio.sleep(Config.BROADCAST_HEARTBEAT)
+        try:
+            if not await broadcast.heartbeat():
+                return  # cancelled or taken over, the next checkpoint stops the broadcast
+        except Exception:
+            continue  # e.g. a db hiccup, the next beat is still well within BROADCAST_STALE_AFTER
+
+async def _batches(broadcast: Broadcast):
+    # team owners in id order from the checkpoint on, streamed with a cursor
+    query = {} if broadcast.last_recipient_id is None else {"_id": {"$gt": broadcast.last_recipient_id}}
+    batch = []
+    async for team in Team.stream(query, {"_id": 1}, sort=[("_id", 1)]):
+        batch.append(team.id)
+        if len(batch) == Config.BROADCAST_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def _run(bot: Bot, broadcast: Broadcast):
+    queue = asyncio.Queue(maxsize=Config.BROADCAST_BATCH_SIZE)
+    result = [_BatchResult()]
+    running = True
+    with send_priority(Priority.BULK):
+        senders = [
+            asyncio.create_task(_sender(bot, broadcast.text, queue, result))
+            for _ in range(Config.BROADCAST_SENDERS)
+        ]
+    # the stale timeout is about this worker being gone, not about slow batches
+    heartbeat = asyncio.create_task(_heartbeat(broadcast))
+    try:
+        await _show_progress(bot, broadcast)
+        shown_at = monotonic()
+        async for chat_ids in _batches(broadcast):
+            for chat_id in chat_ids:
+                await queue.put(chat_id)
+            await queue.join()
+
+            batch, result[0] = result[0], _BatchResult()
+            running = await broadcast.checkpoint(chat_ids[-1], batch.sent, batch.failed, batch.blocked)
+            if not running:
+                break
+            if monotonic() - shown_at >= Config.BROADCAST_PROGRESS_INTERVAL:
+                await _show_progress(bot, broadcast)
+                shown_at = monotonic()
+    finally:
+        heartbeat.cancel()
+        for sender in senders:
+            sender.cancel()
+
+    if not running and broadcast.status == BroadcastStatus.RUNNING:
+        return  # taken over by another worker, it finishes the job
+
+    # one cleanup for the whole broadcast; if it's lost in a crash, reminders find these owners later anyway
+    if broadcast.blocked:
+        await delete_teams(broadcast.blocked, bot, reason="власники заблокували бота під час розсилки")
+    if running:
+        await broadcast.finish()
+    await _show_progress(bot, broadcast)
+
+
+def start_broadcast(bot: Bot, broadcast: Broadcast):
+    task = asyncio.create_task(_run(bot, broadcast))
+    _running[broadcast.id] = task
+    task.add_done_callback(lambda _: _running.pop(broadcast.id, None))
+
+async def resume_broadcasts(bot: Bot):
+    # in a single process every running broadcast that isn't ours is left from before a restart;
+    # in a cluster the other workers' broadcasts are resumed only once their heartbeat stops
+    stale_before = time() - Config.BROADCAST_STALE_AFTER if Config.CLUSTER else time()
+    while broadcast := await Broadcast.claim_orphaned(stale_before, list(_running)):
+        print('BROADCAST RESUMED:', broadcast.id)
+        start_broadcast(bot, broadcast)
+
+def setup_broadcasts():
+    # runs right away on start, so a restart resumes where it stopped
+    scheduler.add_job(
+        resume_broadcasts,
+        "interval",
+        seconds=Config.BROADCAST_STALE_AFTER,
+        id=BROADCAST_WATCHDOG_JOB_ID,
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        next_run_time=datetime.now()
+    )
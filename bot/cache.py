@@ -0,0 +1,51 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Hashable
+
+from bot.config import Config
+
+
+MISSING = object()  # marks a cache miss, since None is a valid cached value (the object doesn't exist)
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+
+        value, expires_at = item
+        if expires_at < monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (value, monotonic() + self._ttl)
+        self._data.move_to_end(key)
+        if len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+users_cache = TTLCache(Config.CACHE_MAX_SIZE, Config.CACHE_TTL)
+teams_cache = TTLCache(Config.CACHE_MAX_SIZE, Config.CACHE_TTL)
+admin_ids_cache = TTLCache(1, Config.CACHE_TTL)
+chats_cache = TTLCache(Config.CACHE_MAX_SIZE, Config.CHAT_CACHE_TTL)  # chat id -> types.Chat or types.User (id, username)
@@ -0,0 +1,65 @@
+from bson import ObjectId
+from datetime import datetime, timedelta
+import asyncio
+import os
+import socket
+
+from bot.config import Config
+from bot.db import db
+from bot.cache import users_cache, teams_cache, admin_ids_cache
+from bot.search import team_index
+
+
+# Several bot processes share one db (Config.CLUSTER). Their in-process caches are kept coherent through the
+# `invalidations` collection: a worker that changes a user or a team writes an event there, every worker polls
+# the collection and drops (or reloads) what changed. Events are idempotent, so reading one twice is harmless,
+# and they are removed by a TTL index (see bot.db.INDEXES).
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# ObjectIds are generated by the writers, so the poll window reaches back far enough to cover clock skew
+_POLL_OVERLAP = timedelta(seconds=10)
+
+
+async def publish_invalidation(cache: str, key):
+    if Config.CLUSTER:
+        await db.invalidations.insert_one({"cache": cache, "key": key, "worker": WORKER_ID, "at": datetime.utcnow()})
+
+
+async def publish_invalidations(cache: str, keys: list):
+    if Config.CLUSTER and keys:
+        at = datetime.utcnow()
+        await db.invalidations.insert_many([{"cache": cache, "key": key, "worker": WORKER_ID, "at": at} for key in keys])
+
+
+async def _apply(event: dict):
+    match event["cache"]:
+        case "users":
+            users_cache.pop(event["key"])
+            admin_ids_cache.clear()
+        case "teams":
+            teams_cache.pop(event["key"])
+            doc = await db.teams.find_one({"_id": event["key"]}, {"name": 1})
+            if doc:
+                team_index.add(doc["_id"], doc["name"])
+            else:
+                team_index.remove(event["key"])
+
+
+async def watch_invalidations():
+    seen: dict[ObjectId, datetime] = {}
+    since = datetime.utcnow()
+    while True:
+        await asyncio.sleep(Config.INVALIDATION_POLL_INTERVAL)
+        now = datetime.utcnow()
+        try:
+            query = {"_id": {"$gt": ObjectId.from_datetime(since - _POLL_OVERLAP)}, "worker": {"$ne": WORKER_ID}}
+            async for event in db.invalidations.find(query).sort("_id", 1):
+                if event["_id"] not in seen:
+                    seen[event["_id"]] = now
+                    await _apply(event)
+        except Exception as e:
+            print('INVALIDATIONS POLL FAILED:', e)
+            continue
+        since = now
+        seen = {event_id: at for event_id, at in seen.items() if now - at <= 2 * _POLL_OVERLAP}
@@ -9,6 +9,29 @@ class Config:
     DB_HOST: str = os.environ['DB_HOST']
     DB_NAME: str = os.environ['DB_NAME']
 
+    BOT_MODE: str = os.environ.get('BOT_MODE', 'polling')  # "polling" or "webhook"
+    BOT_API_URL: str = os.environ.get('BOT_API_URL')  # custom Bot API server, e.g. fake_telegram.py for benchmarks
+
+    WEBHOOK_URL: str = os.environ.get('WEBHOOK_URL', '')  # public base url; if empty the webhook is expected to be set already
+    WEBHOOK_PATH: str = os.environ.get('WEBHOOK_PATH', '/webhook')
+    WEBHOOK_SECRET: str = os.environ.get('WEBHOOK_SECRET')
+    WEBHOOK_MAX_CONNECTIONS: int = int(os.environ.get('WEBHOOK_MAX_CONNECTIONS', 40))
+    WEBAPP_HOST: str = os.environ.get('WEBAPP_HOST', '0.0.0.0')
+    WEBAPP_PORT: int = int(os.environ.get('WEBAPP_PORT', 8080))
+    # several processes behind one webhook (BOT_MODE=webhook is required): updates are handled by all of them,
+    # the scheduler runs only in the one holding the leader lease (bot.leader), caches are synced through the db (bot.cluster)
+    CLUSTER: bool = os.environ.get('CLUSTER', '0') == '1'
+    WORKERS: int = int(os.environ.get('WORKERS', 1))  # processes sharing the bot token, they split the global send rate
+    LEADER_LEASE_TTL = 30  # seconds without a heartbeat after which another worker takes over the scheduler
+    LEADER_HEARTBEAT = 10
+    INVALIDATION_POLL_INTERVAL = 1  # seconds
+    INVALIDATION_TTL = 10 * 60
+
+    # /metrics is served by the webhook app in webhook mode, by a separate server on this port in polling mode
+    METRICS_HOST: str = os.environ.get('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT: int = int(os.environ.get('METRICS_PORT', 9100))  # 0 disables it in polling mode
+    SHUTDOWN_TIMEOUT = 30  # seconds to wait for in-flight updates on shutdown
+
     MINOR_REMINDER_INTERVAL = timedelta(days=3*30)
     MAJOR_REMINDER_INTERVAL = timedelta(days=6*30)
     CONFIRM_REMINDER_INTERVAL = timedelta(days=14)
@@ -17,4 +40,47 @@ class Config:
     # CONFIRM_REMINDER_INTERVAL = timedelta(seconds=2)
 
     ITEMS_PER_PAGE = 20
-    MAX_TEAM_NAME_LENGTH = 50
\ No newline at end of file
+    MAX_TEAM_NAME_LENGTH = 50
+
+    FSM_TTL = 7 * 24 * 60 * 60  # seconds since the last change after which an FSM state is dropped
+
+    # in-process cache of User/Team objects used by the middlewares
+    CACHE_TTL = 300  # seconds
+    CACHE_MAX_SIZE = 10000
+    CHAT_CACHE_TTL = 24 * 60 * 60  # usernames rarely change, and every update from the user refreshes it anyway
+
+    # outgoing messages rate limits (bot.sender.SendQueue), Telegram allows ~30 msg/s overall,
+    # about 1 msg/s per private chat and 20 msg/min per group
+    SEND_GLOBAL_RATE = 30 / WORKERS  # messages per second
+    SEND_CHAT_RATE = 1
+    SEND_GROUP_RATE = 20 / 60
+    SEND_CHAT_BURST = 3  # a handler may answer with a couple of messages at once
+    SEND_MAX_RETRIES = 3  # attempts per message on TelegramRetryAfter
+
+    # "jobs" - one APScheduler job per reminder
+    # "batch" - a periodic dispatcher pops due reminders from the db in batches and sends them through a worker pool
+    # a cluster needs "batch": jobs added by a worker that doesn't run the scheduler would never fire
+    REMINDER_DISPATCH: str = os.environ.get('REMINDER_DISPATCH', 'batch' if CLUSTER else 'jobs')
+    REMINDER_DISPATCH_INTERVAL = 30  # seconds between dispatcher runs
+    REMINDER_BATCH_SIZE = 100
+    REMINDER_SENDERS = 5  # dispatcher worker pool size, the send rate is up to the send queue
+    REMINDER_CLAIM_TIMEOUT = 5 * 60  # seconds after which a reminder claimed by a crashed dispatcher is sent again
+    REMINDER_RETRY_DELAY = 60  # seconds, a reminder that couldn't be sent is put back for later
+    # new reminders are spread over the least loaded hours within +-REMINDER_JITTER of their due time (bot.jobs.reminder),
+    # so teams approved together don't get reminded in the same second months later
+    REMINDER_JITTER = timedelta(days=1)
+    REMINDER_HOUR_CAPACITY = 30  # reminders per hour before the next nearest hour is taken
+    TIMEZONE: str = os.environ.get('TIMEZONE', 'Europe/Kiev')
+    QUIET_HOURS = (22, 9)  # local time [from, to), no reminders are scheduled in it
+
+    # admins' "due soon" view (bot.timeline)
+    TIMELINE_TTL = 10 * 60  # seconds between rebuilds of the per-hour counts from the db
+    TIMELINE_DAYS = 14  # default range of the view
+    TIMELINE_PEAK_HOUR = 20  # reminders in one hour worth showing as a peak
+
+    # admin broadcasts (bot.broadcast), sent after interactive replies and notifications, like reminders
+    BROADCAST_BATCH_SIZE = 100  # recipients between checkpoints, after a crash at most one batch gets the message twice
+    BROADCAST_SENDERS = 5
+    BROADCAST_PROGRESS_INTERVAL = 5  # seconds between edits of the progress message
+    BROADCAST_STALE_AFTER = 2 * 60  # seconds without a heartbeat after which another worker resumes a broadcast
+    BROADCAST_HEARTBEAT = 30  # seconds, a running broadcast is kept alive apart from its checkpoints (slow batches)
\ No newline at end of file
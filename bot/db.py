@@ -1,7 +1,166 @@
 import motor.motor_asyncio
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
 from bot.config import Config
+from bot.metrics import mongo_seconds
 from asyncio import sleep
+from functools import wraps
+from time import perf_counter
+
+
+_TIMED_OPS = {
+    "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one", "delete_many",
+    "find_one_and_delete", "find_one_and_update", "find_one_and_replace", "count_documents",
+    "estimated_document_count", "distinct", "bulk_write", "create_indexes"
+}
+_CURSOR_OPS = {"find", "aggregate"}
+
+
+class TimedCursor:
+    """Cursor proxy that records the time spent fetching: once per to_list, summed over an `async for`, even one left early."""
+
+    def __init__(self, cursor, collection: str, op: str):
+        self._cursor = cursor
+        self._labels = (collection, op)
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name in ("sort", "limit", "skip", "batch_size", "hint", "max_time_ms"):
+            @wraps(attr)
+            def chained(*args, **kwargs):
+                attr(*args, **kwargs)
+                return self
+            return chained
+        return attr
+
+    async def to_list(self, length=None):
+        start = perf_counter()
+        try:
+            return await self._cursor.to_list(length)
+        finally:
+            mongo_seconds.observe(perf_counter() - start, *self._labels)
+
+    async def __aiter__(self):
+        # a generator, so an `async for` left early (break, exception) still records its fetches on close
+        elapsed = 0.0
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    doc = await self._cursor.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    elapsed += perf_counter() - start
+                yield doc
+        finally:
+            mongo_seconds.observe(elapsed, *self._labels)
+
+
+class TimedCollection:
+    """Collection proxy that feeds every async operation into the bot_mongo_seconds histogram."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._name = collection.name
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in _TIMED_OPS:
+            labels = (self._name, name)
+
+            @wraps(attr)
+            async def timed(*args, **kwargs):
+                start = perf_counter()
+                try:
+                    return await attr(*args, **kwargs)
+                finally:
+                    mongo_seconds.observe(perf_counter() - start, *labels)
+        elif name in _CURSOR_OPS:
+            @wraps(attr)
+            def timed(*args, **kwargs):
+                return TimedCursor(attr(*args, **kwargs), self._name, name)
+        else:
+            return attr
+        # cached on the instance, later lookups don't go through __getattr__
+        setattr(self, name, timed)
+        return timed
+
+
+class TimedDatabase:
+
+    def __init__(self, database):
+        self._database = database
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> TimedCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = TimedCollection(self._database[name])
+        return collection
+
+    def __getattr__(self, name):
+        if name.startswith("_") or hasattr(type(self._database), name):
+            return getattr(self._database, name)
+        return self[name]
 
 
 client = motor.motor_asyncio.AsyncIOMotorClient(Config.DB_HOST)
-db = client[Config.DB_NAME]
\ No newline at end of file
+db = TimedDatabase(client[Config.DB_NAME])
+
+
+INDEXES = {
+    "teams": [IndexModel([("name", ASCENDING)], unique=True), IndexModel([("created_at", ASCENDING), ("_id", ASCENDING)])],
+    "users": [IndexModel([("role", ASCENDING)])],
+    "requests": [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+        IndexModel([("sender", ASCENDING)]),
+        IndexModel([("approval_info.batch", ASCENDING)], sparse=True)
+    ],
+    "reminders": [
+        IndexModel([("receiver_id", ASCENDING)]),
+        IndexModel([("remind_at", ASCENDING), ("type", ASCENDING)]),  # covers the timeline aggregation (bot.timeline)
+        IndexModel([("claim", ASCENDING)], sparse=True)
+    ],
+    "fsm": [IndexModel([("updated_at", ASCENDING)], expireAfterSeconds=Config.FSM_TTL)],
+    "invalidations": [IndexModel([("at", ASCENDING)], expireAfterSeconds=Config.INVALIDATION_TTL)],
+    "broadcasts": [IndexModel([("status", ASCENDING)])],
+}
+
+# indexes created by earlier versions and now covered by a compound one above, dropped on startup
+OBSOLETE_INDEXES = {
+    "requests": ["status_1"],
+    "reminders": ["remind_at_1"]
+}
+_NOT_FOUND = (26, 27)  # NamespaceNotFound (no collection yet), IndexNotFound (dropped already)
+
+_transactions_supported = None
+
+
+# multi-document transactions need a replica set or a sharded cluster, a standalone mongod (like in docker-compose) has none
+async def supports_transactions() -> bool:
+    global _transactions_supported
+    if _transactions_supported is None:
+        hello = await client.admin.command("hello")
+        _transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+    return _transactions_supported
+
+
+# safe to run on every startup: create_indexes is a no-op for indexes that already exist
+async def ensure_indexes() -> dict:
+    for col_name, names in OBSOLETE_INDEXES.items():
+        for name in names:
+            try:
+                await db[col_name].drop_index(name)
+            except OperationFailure as e:
+                if e.code not in _NOT_FOUND:
+                    print(f'INDEX {col_name}.{name} NOT DROPPED:', e)
+
+    result = {}
+    for col_name, indexes in INDEXES.items():
+        try:
+            result[col_name] = await db[col_name].create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. duplicate team names already in the db prevent building the unique index
+            result[col_name] = f"FAILED: {e}"
+    return result
@@ -0,0 +1,65 @@
+from aiogram import Bot
+from apscheduler.jobstores.base import JobLookupError
+from time import time
+import asyncio
+
+from bot.config import Config
+from bot.models import Reminder
+from bot.scheduler import scheduler, get_job
+from bot.jobs.reminder import deliver_reminder
+
+
+DISPATCHER_JOB_ID = "reminder-dispatcher"
+
+
+async def _sender(bot: Bot, queue: asyncio.Queue):
+    # paced by the send queue (bot.sender), where reminders come after interactive replies and notifications
+    while True:
+        reminder = await queue.get()
+        try:
+            await deliver_reminder(bot, reminder.receiver_id, reminder.type)
+            # deleted only once delivered, one that isn't (a crash, an error below) is sent again when its claim expires
+            await reminder.delete()
+        except Exception as e:
+            # deliver_reminder's own fallbacks hit the db and Telegram too; a dead sender would leave queue.join()
+            # waiting forever once all of them died, and with max_instances=1 the dispatcher would never run again
+            print('REMINDER DELIVERY FAILED:', reminder.id, e)
+        finally:
+            queue.task_done()
+
+
+async def dispatch_due_reminders(bot: Bot):
+    # the queue is bounded, so after downtime the backlog is claimed from the db one batch at a time, not all at once
+    queue = asyncio.Queue(maxsize=Config.REMINDER_BATCH_SIZE)
+    senders = [asyncio.create_task(_sender(bot, queue)) for _ in range(Config.REMINDER_SENDERS)]
+
+    try:
+        while reminders := await Reminder.claim_due(time(), Config.REMINDER_BATCH_SIZE):
+            for reminder in reminders:
+                # reminders created in "jobs" mode still have their own job, it must not fire again
+                if reminder.job_id and await get_job(reminder.job_id):
+                    scheduler.remove_job(reminder.job_id)
+                await queue.put(reminder)
+        await queue.join()
+    finally:
+        for sender in senders:
+            sender.cancel()
+
+
+def setup_dispatcher():
+    if Config.REMINDER_DISPATCH == "batch":
+        scheduler.add_job(
+            dispatch_due_reminders,
+            "interval",
+            seconds=Config.REMINDER_DISPATCH_INTERVAL,
+            id=DISPATCHER_JOB_ID,
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+    else:
+        # removed even if it isn't loaded yet (see AsyncMongoDBJobStore)
+        try:
+            scheduler.remove_job(DISPATCHER_JOB_ID)
+        except JobLookupError:
+            pass
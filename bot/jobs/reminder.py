@@ -1,77 +1,105 @@
-from aiogram import Bot, types
-from aiogram.exceptions import TelegramForbiddenError
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter, TelegramNetworkError, TelegramServerError
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import random
 
 from bot.config import Config
 from bot.utils import delete_team, notify_admins
 from bot.models import Reminder, Team
 from bot.models.enums import ReminderType
-from bot.keyboards.user import update_reminder_kb, confirm_update_reminder_kb
+from bot.templates import render_reminder
 from bot.scheduler import scheduler
+from bot.sender import send_priority, Priority
+from bot.timeline import reminder_timeline, hour_of, HOUR
 
 
-async def _send_reminder(
-          bot: Bot,
-          user_id: int,
-          reminder_id: str,
-          text: str,
-          reply_markup: types.InlineKeyboardMarkup):
-    reminder = await Reminder.get(reminder_id)
-    await reminder.delete()
-    
+_TZ = ZoneInfo(Config.TIMEZONE)
+
+
+async def deliver_reminder(bot: Bot, user_id: int, type: ReminderType):
+    # the reminder is already popped (or claimed, see bot.jobs.dispatcher), so if Telegram can't take it now
+    # a new one is scheduled for later
+    text, reply_markup = render_reminder(type)
     try:
-        await bot.send_message(user_id, text, reply_markup=reply_markup, disable_web_page_preview=True)
+        with send_priority(Priority.BULK):
+            await bot.send_message(user_id, text, reply_markup=reply_markup, disable_web_page_preview=True)
     except TelegramForbiddenError:
         await delete_team(user_id, bot, reason="користувач заблокував бота")
+    except TelegramRetryAfter as e:
+        await _schedule_reminder(user_id, type, datetime.now() + timedelta(seconds=max(e.retry_after, Config.REMINDER_RETRY_DELAY)))
+    except (TelegramNetworkError, TelegramServerError):
+        await _schedule_reminder(user_id, type, datetime.now() + timedelta(seconds=Config.REMINDER_RETRY_DELAY))
     except Exception as e:
         await notify_admins(bot, f"⚠️ Помилка відправки нагадування користувачу ID={user_id}: {e}")
-        
 
-async def _set_reminder(user_id: int, type: ReminderType) -> Reminder:
-    now = datetime.now()
-    reminder_id = f"{type.name}-{user_id}-{int(now.timestamp())}"
-    reminder_str = ReminderType.to_ukr(type).upper()
+async def _send_reminder(bot: Bot, user_id: int, reminder_id: str, type: str):
+    # None if the reminder was deleted meanwhile or already sent by the batch dispatcher (bot.jobs.dispatcher)
+    if await Reminder.pop(reminder_id):
+        await deliver_reminder(bot, user_id, ReminderType[type])
+
+
+async def _schedule_reminder(user_id: int, type: ReminderType, run_date: datetime) -> Reminder:
+    reminder_id = f"{type.name}-{user_id}-{int(datetime.now().timestamp())}"
+
+    if Config.REMINDER_DISPATCH == "batch":
+        # no job needed, the dispatcher picks reminders up by remind_at
+        job_id, remind_at = None, run_date.timestamp()
+    else:
+        # only ids go into the job: the job store pickles kwargs, the text and keyboard are rendered at fire time
+        job = scheduler.add_job(
+            _send_reminder,
+            "date",
+            kwargs={"user_id": user_id, "reminder_id": reminder_id, "type": type.name},
+            run_date=run_date,
+            misfire_grace_time=None
+        )
+        job_id, remind_at = job.id, job.trigger.run_date.timestamp()
 
-    # TO-DO (maybe): create a class for each type cuz cringe
+    return await Reminder.create(
+        id=reminder_id,
+        job_id=job_id,
+        receiver_id=user_id,
+        remind_at=remind_at,
+        type=type
+    )
+
+async def _set_reminder(user_id: int, type: ReminderType) -> Reminder:
     match type:
         case ReminderType.MINOR:
-            text = f"🌱 <b>{reminder_str} оновлення</b>\n\n" \
-            "Привіт, пора оновити пост команди на каналі @UA_manga :) \nПисати адмінці в особисті. \n" \
-            "Деталі про написання можна знайти тут: https://t.me/UA_manga_extra/30  \n\n" \
-            "Обов'язково натисни одну з кнопок, щоб повідомити мене про своє рішення та поставити нове нагадування 👇"
-            reply_markup = update_reminder_kb(reminder_type=type)
             tdelta = Config.MINOR_REMINDER_INTERVAL
         case ReminderType.MAJOR:
-            text = f"🌱 <b>{reminder_str} оновлення</b>\n\n" \
-            "Привіт, пора повністю оновити пост твоєї команди на каналі @UA_manga :) \nПисати адмінці в особисті. \n" \
-            "Деталі про написання можна знайти тут: https://t.me/UA_manga_extra/30  \n\n" \
-            "Обов'язково натисни одну з кнопок, щоб повідомити мене про своє рішення та поставити нове нагадування 👇"
-            reply_markup = update_reminder_kb(reminder_type=type)
             tdelta = Config.MAJOR_REMINDER_INTERVAL
         case ReminderType.CONFIRM_MINOR | ReminderType.CONFIRM_MAJOR:
-            text = f"❗️ <b>{reminder_str} оновлення</b>\n\n" \
-            "Привіт, ви вже надіслали новий пост адмінці?\n\n" \
-            "Обов'язково натисни одну з кнопок, щоб повідомити мене про своє рішення та поставити нове нагадування 👇"
-            reply_markup = confirm_update_reminder_kb(confirmation_type=type)
             tdelta = Config.CONFIRM_REMINDER_INTERVAL
         case _:
             return
 
-    job = scheduler.add_job(
-        _send_reminder,
-        "date",
-        kwargs={"user_id": user_id, "reminder_id": reminder_id, "text": text, "reply_markup": reply_markup},
-        run_date=now + tdelta,
-        misfire_grace_time=None
-    )
+    return await _schedule_reminder(user_id, type, await _pick_run_date(datetime.now() + tdelta))
 
-    return await Reminder.create(
-        id=reminder_id,
-        job_id=job.id,
-        receiver_id=user_id,
-        remind_at=job.trigger.run_date.timestamp(),
-        type=type
-    )
+def _is_quiet(ts: float) -> bool:
+    start, end = Config.QUIET_HOURS
+    hour = datetime.fromtimestamp(ts, _TZ).hour
+    return start <= hour or hour < end if start > end else start <= hour < end
+
+async def _pick_run_date(target: datetime) -> datetime:
+    # the nearest hour to a jittered target that is under REMINDER_HOUR_CAPACITY and out of quiet hours, else the
+    # least loaded one; the hours around the target are tried both ways, so on average the interval stays the same.
+    # Counts are the pending reminders (bot.timeline), the new one is counted by Reminder.create before any await
+    jitter = Config.REMINDER_JITTER.total_seconds()
+    start, end = target.timestamp() - jitter, target.timestamp() + jitter
+    center = target.timestamp() + random.uniform(-jitter, jitter)
+
+    counts = {hour: sum(types.values()) for hour, types in await reminder_timeline.hours(start, end + HOUR)}
+    hours = [hour for hour in range(hour_of(start), int(end) + 1, HOUR) if not _is_quiet(hour)]
+    if not hours:
+        return target
+    hours.sort(key=lambda hour: abs(hour + HOUR / 2 - center))
+
+    hour = next((hour for hour in hours if counts.get(hour, 0) < Config.REMINDER_HOUR_CAPACITY), None)
+    if hour is None:
+        hour = min(hours, key=lambda hour: counts.get(hour, 0))
+    return datetime.fromtimestamp(hour + random.uniform(0, HOUR))
 
 async def set_minor_reminder(user_id: int) -> Reminder:
     return await _set_reminder(user_id, ReminderType.MINOR)
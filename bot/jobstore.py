@@ -0,0 +1,187 @@
+import asyncio
+import pickle
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.mongodb import MongoDBJobStore
+from apscheduler.util import datetime_to_utc_timestamp
+from bson.binary import Binary
+from pymongo import ASCENDING
+
+
+LOAD_BATCH_SIZE = 500
+
+
+class AsyncMongoDBJobStore(MemoryJobStore):
+    """
+    MongoDBJobStore runs pymongo right in the event loop, so every add_job/reschedule/remove
+    blocks update processing for a db round trip. This store serves all reads from memory
+    and writes to MongoDB from a single background thread (which keeps the writes ordered).
+
+    Documents have exactly the MongoDBJobStore format, so existing jobs are picked up as is.
+
+    With background_load (and a running event loop) start() returns at once and the jobs are loaded
+    by a task in batches, the soonest first, so the bot serves updates while a big store is loading.
+    Meanwhile the scheduler only sees the loaded jobs; code that looks a job up by id awaits load_job first.
+    """
+
+    def __init__(self, database="apscheduler", collection="jobs", background_load=True, upgrade_job=None, **connect_args):
+        super().__init__()
+        # upgrade_job(job) -> bool fixes up a job stored by an older version as it's loaded, True to persist it
+        self._upgrade_job = upgrade_job
+        self._mongo_args = dict(database=database, collection=collection, **connect_args)
+        self._mongo = MongoDBJobStore(**self._mongo_args)
+        self._mongo_closed = False
+        self._executor: ThreadPoolExecutor = None
+        self._background_load = background_load
+        self._loading: asyncio.Task = None
+        self._removed_while_loading = set()
+
+    def start(self, scheduler, alias):
+        # a new executor on every start, the scheduler may be started again after a shutdown (see bot.leader)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobstore")
+        if self._mongo_closed:
+            # shutdown() closed the client and pymongo can't reopen it, so a new one for the next start
+            self._mongo = MongoDBJobStore(**self._mongo_args)
+            self._mongo_closed = False
+        super().start(scheduler, alias)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if self._background_load and loop:
+            # the executor runs everything in order: index creation, then the loading queries
+            self._executor.submit(self._mongo.start, scheduler, alias)
+            self._loading = loop.create_task(self._load())
+        else:
+            self._mongo.start(scheduler, alias)
+            for job in self._mongo.get_all_jobs():
+                self._add_loaded(job)
+
+    async def _load(self):
+        loop = asyncio.get_running_loop()
+        cursor = self._mongo.collection.find({}, ["job_state"], sort=[("next_run_time", ASCENDING)], batch_size=LOAD_BATCH_SIZE)
+        failed_job_ids = []
+        try:
+            while docs := await loop.run_in_executor(self._executor, list, islice(cursor, LOAD_BATCH_SIZE)):
+                for doc in docs:
+                    # already there if it was added or looked up meanwhile
+                    if doc["_id"] in self._jobs_index or doc["_id"] in self._removed_while_loading:
+                        continue
+                    try:
+                        job = self._mongo._reconstitute_job(doc["job_state"])
+                    except BaseException:
+                        self._logger.exception('Unable to restore job "%s" -- removing it', doc["_id"])
+                        failed_job_ids.append(doc["_id"])
+                        continue
+                    self._add_loaded(job)
+                # the scheduler only knew the wakeup time of the jobs loaded before
+                self._scheduler.wakeup()
+                await asyncio.sleep(0)
+        finally:
+            cursor.close()
+            self._removed_while_loading.clear()
+
+        if failed_job_ids:
+            self._write(self._mongo.collection.delete_many, {"_id": {"$in": failed_job_ids}})
+
+    def _add_loaded(self, job):
+        super().add_job(job)
+        if self._upgrade_job and self._upgrade_job(job):
+            self._write(self._mongo.collection.update_one, {"_id": job.id}, {"$set": self._serialize(job)})
+
+    @property
+    def loading(self) -> bool:
+        return self._loading is not None and not self._loading.done()
+
+    async def wait_loaded(self):
+        if self._loading:
+            await asyncio.shield(self._loading)
+
+    async def load_job(self, job_id):
+        # lookup_job only sees loaded jobs; this also reads a stored job that isn't loaded yet, without blocking
+        # the event loop (it waits behind the queued batches and writes in the executor)
+        job = super().lookup_job(job_id)
+        if job is None and self.loading and job_id not in self._removed_while_loading:
+            job = await asyncio.wrap_future(self._executor.submit(self._mongo.lookup_job, job_id))
+            # added or removed while it was read
+            if job_id in self._jobs_index or job_id in self._removed_while_loading:
+                return super().lookup_job(job_id)
+            if job:
+                self._add_loaded(job)
+        return job
+
+    def add_job(self, job):
+        super().add_job(job)
+        if self.loading:
+            # a stored job with this id may not be loaded yet, the new one replaces it (what replace_existing
+            # wants; ids without replace_existing are unique in the bot) and the loading skips the stored one
+            self._write(self._mongo.collection.replace_one, {"_id": job.id}, self._serialize(job), True)
+        else:
+            self._write(self._mongo.collection.insert_one, {"_id": job.id, **self._serialize(job)})
+
+    def update_job(self, job):
+        super().update_job(job)
+        self._write(self._mongo.collection.update_one, {"_id": job.id}, {"$set": self._serialize(job)})
+
+    def remove_job(self, job_id):
+        if self.loading:
+            # a batch read before the removal may still have it, even if it's loaded already
+            self._removed_while_loading.add(job_id)
+        if job_id in self._jobs_index or not self.loading:
+            super().remove_job(job_id)
+        self._write(self._mongo.collection.delete_one, {"_id": job_id})
+
+    def remove_jobs(self, job_ids: list):
+        # remove_job for many jobs with one delete_many; ids of jobs that don't exist are skipped
+        if self._executor is None:
+            # not started, e.g. on a cluster worker that isn't the leader: the jobs are in the leader's store,
+            # and when they fire they find their reminders gone
+            return
+        for job_id in job_ids:
+            if self.loading:
+                self._removed_while_loading.add(job_id)
+            if job_id in self._jobs_index:
+                super().remove_job(job_id)
+        if job_ids:
+            self._write(self._mongo.collection.delete_many, {"_id": {"$in": job_ids}})
+
+    def remove_all_jobs(self):
+        super().remove_all_jobs()
+        self._write(self._mongo.collection.delete_many, {})
+
+    def shutdown(self):
+        if self._loading:
+            self._loading.cancel()
+        # flush pending writes before closing the connection
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        # a client passed in belongs to the caller
+        if "client" not in self._mongo_args:
+            self._mongo.shutdown()
+            self._mongo_closed = True
+        # not super().shutdown(): it goes through self.remove_all_jobs and would wipe the persisted jobs
+        super().remove_all_jobs()
+
+    def _serialize(self, job) -> dict:
+        # pickled here and not in the worker thread, since the scheduler may modify the job meanwhile
+        return {
+            "next_run_time": datetime_to_utc_timestamp(job.next_run_time),
+            "job_state": Binary(pickle.dumps(job.__getstate__(), self._mongo.pickle_protocol))
+        }
+
+    def _write(self, method, *args):
+        future = self._executor.submit(method, *args)
+        future.add_done_callback(self._log_write_error)
+
+    def _log_write_error(self, future: Future):
+        if exc := future.exception():
+            self._logger.error("Failed to persist a job change: %s", exc)
+
+    def __len__(self) -> int:
+        return len(self._jobs_index)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (client={self._mongo.client})>"
@@ -0,0 +1,14 @@
+from aiogram.types import InlineKeyboardMarkup, ReplyKeyboardMarkup
+
+
+# keyboards that are built once and never modified, the bot session serializes each of them
+# to JSON only once (see bot.templates.TemplateSession)
+_static: dict[int, InlineKeyboardMarkup | ReplyKeyboardMarkup] = {}
+
+
+def static(markup: InlineKeyboardMarkup | ReplyKeyboardMarkup) -> InlineKeyboardMarkup | ReplyKeyboardMarkup:
+    _static[id(markup)] = markup
+    return markup
+
+def is_static(markup) -> bool:
+    return _static.get(id(markup)) is markup
\ No newline at end of file
@@ -1,30 +1,33 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from functools import lru_cache
 from typing import List
 
-from bot.config import Config
-from bot.models import Team, Reminder
+from bot.keyboards import static
+from bot.models import Team, Reminder, Request
 from bot.models.enums import ReminderType
 
 
-admin_menu = ReplyKeyboardMarkup(keyboard=[
+admin_menu = static(ReplyKeyboardMarkup(keyboard=[
     [KeyboardButton(text="Команди")],
-    [KeyboardButton(text="Користувачі")]
-], resize_keyboard=True)
+    [KeyboardButton(text="Користувачі")],
+    [KeyboardButton(text="Запити")],
+    [KeyboardButton(text="Розклад")]
+], resize_keyboard=True))
 
-admin_users_menu = ReplyKeyboardMarkup(keyboard=[
+admin_users_menu = static(ReplyKeyboardMarkup(keyboard=[
     [KeyboardButton(text="Заблокувати")],
     [KeyboardButton(text="Розблокувати")],
     [KeyboardButton(text="Назад")]
-], resize_keyboard=True)
+], resize_keyboard=True))
 
-team_info_kb = InlineKeyboardMarkup(inline_keyboard=[
+team_info_kb = static(InlineKeyboardMarkup(inline_keyboard=[
     [InlineKeyboardButton(text="Нагадування", callback_data="reminders")],
     [InlineKeyboardButton(text="Видалити", callback_data="delete")],
     [InlineKeyboardButton(text="Назад", callback_data="back")]
-])
+]))
 
-def team_list_kb(teams: List[Team], total_count: int, page: int = 0, count: int = Config.ITEMS_PER_PAGE):
+def team_list_kb(teams: List[Team], has_prev: bool, has_next: bool):
     builder = InlineKeyboardBuilder()
 
     for t in teams:
@@ -32,29 +35,45 @@ def team_list_kb(teams: List[Team], total_count: int, page: int = 0, count: int
 
     builder.adjust(4)
 
-    if total_count > count:
-        control_buttons = []
-        if page > 0:
-            control_buttons.append(InlineKeyboardButton(text="⬅️", callback_data="prev"))
-        start = page * count
-        end = start + count
-        if end < total_count:
-            control_buttons.append(InlineKeyboardButton(text="➡️", callback_data="next"))
+    # page buttons carry the keyset cursor for Team.find_page: the first/last team of this page
+    control_buttons = []
+    if has_prev and teams:
+        control_buttons.append(InlineKeyboardButton(text="⬅️", callback_data=f"prev:{teams[0].created_at!r}:{teams[0].id}"))
+    if has_next and teams:
+        control_buttons.append(InlineKeyboardButton(text="➡️", callback_data=f"next:{teams[-1].created_at!r}:{teams[-1].id}"))
+    if control_buttons:
         builder.row(*control_buttons)
         
     builder.row(InlineKeyboardButton(text="❌ Вийти", callback_data="exit"))
     return builder.as_markup()
 
 def team_reminders_kb(reminders: List[Reminder]):
+    return InlineKeyboardMarkup(inline_keyboard=[
+        *(
+            [InlineKeyboardButton(text=f"Змінити {ReminderType.to_ukr(r.type)}", callback_data=f"reminder:{r.id}")]
+            for r in reminders
+        ),
+        [InlineKeyboardButton(text="Назад", callback_data="back")]
+    ])
+
+def requests_queue_kb(requests: List[Request], selected: set[str]):
     builder = InlineKeyboardBuilder()
 
-    for r in reminders:
+    for r in requests:
+        mark = "☑️" if str(r.id) in selected else "⬜️"
+        builder.row(InlineKeyboardButton(text=f"{mark} {r.team_name}", callback_data=f"queue:toggle:{r.id}"))
+
+    if requests:
+        builder.row(InlineKeyboardButton(text="Вибрати всі", callback_data="queue:all"))
         builder.row(
-            InlineKeyboardButton(
-                text=f"Змінити {ReminderType.to_ukr(r.type)}",
-                callback_data=f"reminder:{r.id}"
-            )
+            InlineKeyboardButton(text="✅ Прийняти", callback_data="queue:approve"),
+            InlineKeyboardButton(text="⛔️ Відхилити", callback_data="queue:decline")
         )
+    builder.row(InlineKeyboardButton(text="❌ Вийти", callback_data="queue:exit"))
+    return builder.as_markup()
 
-    builder.row(InlineKeyboardButton(text="Назад", callback_data="back"))
-    return builder.as_markup()
\ No newline at end of file
+@lru_cache(maxsize=256)  # the markup is shared, callers must not modify it
+def broadcast_progress_kb(broadcast_id: str):
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="⏹ Зупинити", callback_data=f"broadcast:cancel:{broadcast_id}")]
+    ])
@@ -1,19 +1,23 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from functools import lru_cache
 
+from bot.keyboards import static
 
-confirmation_kb = InlineKeyboardMarkup(inline_keyboard=[
+
+confirmation_kb = static(InlineKeyboardMarkup(inline_keyboard=[
     [InlineKeyboardButton(text="Так", callback_data="confirm")],
     [InlineKeyboardButton(text="Назад", callback_data="back")]
-])
+]))
 
-cancel_kb = InlineKeyboardMarkup(inline_keyboard=[
+cancel_kb = static(InlineKeyboardMarkup(inline_keyboard=[
     [InlineKeyboardButton(text="Відмінити", callback_data="cancel")]
-])
+]))
 
-set_reminders_kb = InlineKeyboardMarkup(
+set_reminders_kb = static(InlineKeyboardMarkup(
     inline_keyboard=[[InlineKeyboardButton(text="Поставити нагадування", callback_data="enrem")]]
-)
+))
 
+@lru_cache(maxsize=256)  # the markup is shared, callers must not modify it
 def request_approval_kb(request_id: str):
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="Прийняти", callback_data=f"request:approve:{request_id}")],
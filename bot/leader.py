@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+import asyncio
+
+from bot.config import Config
+from bot.db import db
+from bot.cluster import WORKER_ID
+from bot.scheduler import scheduler, jobstore
+from bot.jobs.dispatcher import setup_dispatcher, DISPATCHER_JOB_ID
+from bot.broadcast import setup_broadcasts, BROADCAST_WATCHDOG_JOB_ID
+from bot.utils import spawn_background
+
+
+SCHEDULER_LEASE = "scheduler"
+
+
+class LeaderLease:
+    """
+    A lease in the `leases` collection: a document owned by one worker until `expires_at`.
+    The owner renews it every heartbeat; once it stops (crash, network split), any worker can take it over.
+    Expiry is compared on the workers' clocks, so they are expected to be NTP-synced to well within the TTL.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+
+    async def acquire(self) -> bool:
+        # acquires a free or expired lease, or renews our own
+        now = datetime.utcnow()
+        try:
+            await db.leases.find_one_and_update(
+                {"_id": self._name, "$or": [{"owner": WORKER_ID}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": WORKER_ID, "expires_at": now + timedelta(seconds=Config.LEADER_LEASE_TTL)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # the filter didn't match, so the upsert collided with a lease held by another worker
+            return False
+        return True
+
+    async def release(self):
+        await db.leases.delete_one({"_id": self._name, "owner": WORKER_ID})
+
+
+async def _remove_legacy_jobs():
+    # reminders are popped by the dispatcher, jobs left from "jobs" mode would fire on the old schedule
+    await jobstore.wait_loaded()
+    for job in scheduler.get_jobs():
+        if job.id not in (DISPATCHER_JOB_ID, BROADCAST_WATCHDOG_JOB_ID):
+            job.remove()
+
+def _start_scheduler():
+    scheduler.start()
+    try:
+        setup_dispatcher()
+        setup_broadcasts()
+    except Exception:
+        scheduler.shutdown(wait=False)
+        raise
+    # after the background loading, the lease heartbeat can't wait for it
+    spawn_background(_remove_legacy_jobs())
+    print('SCHEDULER LEADER:', WORKER_ID)
+
+def _stop_scheduler():
+    try:
+        scheduler.shutdown(wait=False)
+    except Exception as e:
+        print('SCHEDULER STOP FAILED:', e)
+    print('SCHEDULER STOPPED:', WORKER_ID)
+
+async def _release(lease: LeaderLease):
+    try:
+        await lease.release()
+    except Exception as e:
+        print('LEADER LEASE RELEASE FAILED:', e)
+
+
+async def run_scheduler_leader(stop: asyncio.Event):
+    # runs the scheduler while this worker holds the lease; if a renewal fails, the scheduler is stopped
+    # right away instead of when the lease expires, so two leaders never overlap while clocks agree
+    lease = LeaderLease(SCHEDULER_LEASE)
+    leader = False
+    try:
+        while not stop.is_set():
+            try:
+                acquired = await lease.acquire()
+            except Exception as e:
+                print('LEADER LEASE FAILED:', e)
+                acquired = False
+
+            # a failed start or stop must not end the heartbeat, or this worker would never lead again
+            if acquired and not leader:
+                try:
+                    _start_scheduler()
+                except Exception as e:
+                    print('SCHEDULER START FAILED:', e)
+                    # let another worker lead meanwhile, this one tries again on a later heartbeat
+                    acquired = False
+                    await _release(lease)
+            elif leader and not acquired:
+                _stop_scheduler()
+            leader = acquired
+
+            try:
+                await asyncio.wait_for(stop.wait(), Config.LEADER_HEARTBEAT)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if leader:
+            _stop_scheduler()
+            await _release(lease)
@@ -0,0 +1,126 @@
+from aiohttp import web
+from bisect import bisect_left
+from collections import defaultdict
+from time import perf_counter
+from typing import Callable
+
+from bot.config import Config
+
+
+# Minimal Prometheus text-format metrics: label sets are plain tuples, updates are a dict lookup and an add,
+# so instrumenting hot paths costs next to nothing. Exposed on /metrics (see setup_metrics_route).
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_str(names: tuple, values: tuple, le: str = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+
+    def __init__(self, name: str, doc: str, labels: tuple = ()):
+        self.name, self.doc, self.labels = name, doc, labels
+        self._values = defaultdict(float)
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] += amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels_str(self.labels, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    # value is read from a callback at scrape time
+
+    def __init__(self, name: str, doc: str, callback: Callable[[], float]):
+        self.name, self.doc, self.callback = name, doc, callback
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} gauge", f"{self.name} {self.callback()}"]
+
+
+class Histogram:
+
+    def __init__(self, name: str, doc: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name, self.doc, self.labels, self.buckets = name, doc, labels, buckets
+        self._counts = {}  # labels -> per-bucket counts (not cumulative), the last one is +Inf
+        self._sums = defaultdict(float)
+        _registry.append(self)
+
+    def observe(self, seconds: float, *labels):
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+        counts[bisect_left(self.buckets, seconds)] += 1
+        self._sums[labels] += seconds
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        for labels, counts in self._counts.items():
+            total = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                total += count
+                lines.append(f"{self.name}_bucket{_labels_str(self.labels, labels, bound)} {total}")
+            lines.append(f"{self.name}_sum{_labels_str(self.labels, labels)} {self._sums[labels]}")
+            lines.append(f"{self.name}_count{_labels_str(self.labels, labels)} {total}")
+        return lines
+
+
+def render() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=render(), content_type="text/plain")
+
+
+def setup_metrics_route(app: web.Application):
+    app.router.add_get("/metrics", metrics_handler)
+
+
+async def start_metrics_server() -> web.AppRunner:
+    # for polling mode; in webhook mode /metrics is served by the webhook app
+    app = web.Application()
+    setup_metrics_route(app)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, Config.METRICS_HOST, Config.METRICS_PORT).start()
+    return runner
+
+
+handler_seconds = Histogram("bot_handler_seconds", "Update handling time, middlewares included", ("router", "handler", "state"))
+global_middleware_seconds = Histogram("bot_global_middleware_seconds", "GlobalMiddleware time before the handler")
+mongo_seconds = Histogram("bot_mongo_seconds", "MongoDB operation time", ("collection", "op"))
+telegram_seconds = Histogram("bot_telegram_api_seconds", "Bot API request time", ("method",))
+telegram_errors = Counter("bot_telegram_api_errors_total", "Bot API errors", ("method", "error"))
+telegram_retries = Counter("bot_telegram_retries_total", "Sends retried after TelegramRetryAfter", ("priority",))
+
+
+class timer:
+    # with timer(histogram, *labels): ...
+
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: Histogram, *labels):
+        self._histogram, self._labels = histogram, labels
+
+    def __enter__(self):
+        self._start = perf_counter()
+
+    def __exit__(self, *exc):
+        self._histogram.observe(perf_counter() - self._start, *self._labels)
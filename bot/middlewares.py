@@ -1,19 +1,93 @@
-from aiogram import BaseMiddleware, types
+from aiogram import BaseMiddleware, Bot, types
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
 from aiogram.types import TelegramObject
+from time import perf_counter
 from typing import Callable, Dict, Any, Awaitable, Union
 
 from bot.models import User
 from bot.models.enums import Role
+from bot.cache import chats_cache
+from bot.config import Config
+from bot.metrics import handler_seconds, global_middleware_seconds, telegram_seconds, telegram_errors, telegram_retries
+from bot.sender import send_queue, current_priority
+
+
+class TimingMiddleware(BaseMiddleware):
+    """Outermost inner middleware: times the rest of the chain and the handler, labeled by router, handler and state."""
+
+    async def __call__(self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ):
+        start = perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            handler_seconds.observe(
+                perf_counter() - start,
+                data["event_router"].name, data["handler"].callback.__name__, data.get("raw_state")
+            )
+
+
+class TelegramTimingMiddleware(BaseRequestMiddleware):
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        start = perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            telegram_errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            telegram_seconds.observe(perf_counter() - start, name)
+
+
+class SendQueueMiddleware(BaseRequestMiddleware):
+    """Every message sent or edited by the bot (handlers, notifications, reminders) waits for its slot in send_queue."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ) -> Response[TelegramType]:
+        if not type(method).__name__.startswith(("Send", "Edit", "Copy", "Forward")):
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+        priority = current_priority()
+        for attempt in range(Config.SEND_MAX_RETRIES):
+            await send_queue.acquire(chat_id, priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == Config.SEND_MAX_RETRIES - 1:
+                    raise
+                telegram_retries.inc(priority.name)
+                send_queue.pause(e.retry_after)
 
 
 class GlobalMiddleware(BaseMiddleware):
 
     async def __call__(self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
-        event: Union[types.Message, types.CallbackQuery],
+        event: Union[types.Message, types.CallbackQuery, types.InlineQuery],
         data: Dict[str, Any]
     ):
+        start = perf_counter()
+        chats_cache.set(event.from_user.id, event.from_user)
         data["user"] = await User.get(event.from_user.id)
+        global_middleware_seconds.observe(perf_counter() - start)
         if data["user"]:
             if data["user"].banned:
                 return
@@ -22,9 +96,11 @@ class GlobalMiddleware(BaseMiddleware):
                 if event.text != "/start":
                     await event.answer("Будь ласка, напишіть /start, щоб зареєструватися в боті.")
                     return
-            else:
+            elif isinstance(event, types.CallbackQuery):
                 await data["bot"].send_message(event.from_user.id, "Будь ласка, напишіть /start, щоб зареєструватися в боті.")
                 return
+            else:
+                return
         
         return await handler(event, data)
 
@@ -1 +1 @@
-from .models import User, Team, Request, Reminder
\ No newline at end of file
+from .models import User, Team, Request, Reminder, Broadcast
\ No newline at end of file
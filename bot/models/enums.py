@@ -12,6 +12,12 @@ class RequestStatus(Enum):
     DECLINED = "declined"  # team creation has been declined by an admin
 
 
+class BroadcastStatus(Enum):
+    RUNNING = "running"
+    DONE = "done"
+    CANCELLED = "cancelled"  # stopped by an admin
+
+
 class ReminderType(Enum):
     MINOR = "minor"
     MAJOR = "major"
@@ -20,10 +26,18 @@ class ReminderType(Enum):
 
     @classmethod
     def to_ukr(cls, type) -> str:
-        type_to_str = {
-            cls.MINOR: "звичайне",
-            cls.MAJOR: "повне",
-            cls.CONFIRM_MINOR: "підтвердження (звичайне)",
-            cls.CONFIRM_MAJOR: "підтвердження (повне)"
-        }
-        return type_to_str[type]
\ No newline at end of file
+        return _REMINDER_TYPE_UKR[type]
+
+
+# value -> member, for parsing db documents (a dict lookup instead of Enum's name lookup on an upper-cased string)
+ROLES = {role.value: role for role in Role}
+REQUEST_STATUSES = {status.value: status for status in RequestStatus}
+REMINDER_TYPES = {type.value: type for type in ReminderType}
+BROADCAST_STATUSES = {status.value: status for status in BroadcastStatus}
+
+_REMINDER_TYPE_UKR = {
+    ReminderType.MINOR: "звичайне",
+    ReminderType.MAJOR: "повне",
+    ReminderType.CONFIRM_MINOR: "підтвердження (звичайне)",
+    ReminderType.CONFIRM_MAJOR: "підтвердження (повне)"
+}
\ No newline at end of file
@@ -1,16 +1,30 @@
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, BulkWriteError
 from time import time
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from bot.db import db
+from bot.db import db, client, supports_transactions
 from bot.config import Config
-from bot.scheduler import scheduler
-from .enums import Role, RequestStatus, ReminderType
+from bot.scheduler import get_job
+from bot.cache import users_cache, teams_cache, admin_ids_cache, MISSING
+from bot.search import team_index
+from bot.timeline import reminder_timeline
+from bot.cluster import publish_invalidation, publish_invalidations, WORKER_ID
+from .enums import (
+    Role, RequestStatus, ReminderType, BroadcastStatus, ROLES, REQUEST_STATUSES, REMINDER_TYPES, BROADCAST_STATUSES
+)
 from bot.exceptions import TeamAlreadyExistsException, UserAlreadyExistsException
 
 
+# Objects are built from projected documents where a call site needs only a few fields (e.g. a listing),
+# the fields left out are None. Only full objects go to the caches (see get/create).
+
+
 class User:
 
+    __slots__ = ("_id", "_role", "_banned", "_created_at")
+
     def __init__(self, id: int, role: Role, banned: bool, created_at: float):
         self._id: int = id  # telegram user/chat id; User.id = Team.id
         self._role: Role = role
@@ -20,48 +34,69 @@ class User:
     async def get_team(self):
         return await Team.get(self._id)
     
-    async def get_reminders(self):
-        reminders = []
-        async for reminder in db.reminders.find({"receiver_id": self._id}):
-            reminders.append(Reminder.from_doc(reminder))
-        return reminders
+    async def get_reminders(self, projection: dict = None):
+        return [reminder async for reminder in Reminder.stream({"receiver_id": self._id}, projection)]
+
+    async def has_reminders(self) -> bool:
+        return await db.reminders.find_one({"receiver_id": self._id}, {"_id": 1}) is not None
     
     async def change_role(self, role: Role):
         await db.users.update_one({"_id": self._id}, {"$set": {"role": role.value}})
         self._role = role
+        users_cache.set(self._id, self)
+        admin_ids_cache.clear()
+        await publish_invalidation("users", self._id)
 
     async def ban(self):
         await db.users.update_one({"_id": self._id}, {"$set": {"banned": True}})
         self._banned = True
+        users_cache.set(self._id, self)
+        await publish_invalidation("users", self._id)
 
     async def unban(self):
         await db.users.update_one({"_id": self._id}, {"$set": {"banned": False}})
         self._banned = False
+        users_cache.set(self._id, self)
+        await publish_invalidation("users", self._id)
 
-    async def find_requests(self, status: RequestStatus = RequestStatus.PENDING):
-        requests = []
-        async for request in db.requests.find({"status": status.value}):
-            requests.append(Request.from_doc(request))
-        return requests
+    async def find_requests(self, status: RequestStatus = RequestStatus.PENDING, projection: dict = None):
+        return [
+            Request.from_doc(doc)
+            async for doc in db.requests.find({"sender": self._id, "status": status.value}, projection)
+        ]
 
     @classmethod
     async def get(cls, id: int):
-        user = await db.users.find_one({"_id": id})
-        if not user:
-            return None
-        
-        return cls.from_doc(user)
+        user = users_cache.get(id)
+        if user is not MISSING:
+            return user
+
+        doc = await db.users.find_one({"_id": id})
+        user = cls.from_doc(doc) if doc else None
+        users_cache.set(id, user)
+        return user
+
+    @classmethod
+    async def stream(cls, query: dict = {}, projection: dict = None):
+        # documents are parsed as the cursor batches arrive, for listings that don't need them all at once
+        async for doc in db.users.find(query, projection):
+            yield cls.from_doc(doc)
 
     @classmethod
-    async def find(cls, query: dict = {}):
-        users = []
-        async for doc in db.users.find(query):
-            users.append(cls.from_doc(doc))
-        return users
+    async def find(cls, query: dict = {}, projection: dict = None):
+        return [user async for user in cls.stream(query, projection)]
 
     @classmethod
     async def find_admins(cls):
         return await cls.find({"role": Role.ADMIN.value})
+
+    @classmethod
+    async def find_admin_ids(cls) -> set[int]:
+        admin_ids = admin_ids_cache.get("admins")
+        if admin_ids is MISSING:
+            admin_ids = {doc["_id"] async for doc in db.users.find({"role": Role.ADMIN.value}, {"_id": 1})}
+            admin_ids_cache.set("admins", admin_ids)
+        return admin_ids
     
     @classmethod
     async def create(
@@ -82,13 +117,19 @@ class User:
         user_data = {"_id": id, "role": role.value, "banned": banned, "created_at": time()}
         await db.users.insert_one(user_data)
 
-        return cls.from_doc(user_data)
+        user = cls.from_doc(user_data)
+        users_cache.set(id, user)
+        if role == Role.ADMIN:
+            admin_ids_cache.clear()
+        # other workers may have cached that there is no such user
+        await publish_invalidation("users", id)
+        return user
 
     @classmethod
     def from_doc(cls, data: dict):
         return cls(
             id=data["_id"],
-            role=Role[data["role"].upper()],
+            role=ROLES[data["role"]],
             banned=data["banned"],
             created_at=data["created_at"]
         )
@@ -112,6 +153,8 @@ class User:
 
 class Team:
 
+    __slots__ = ("_id", "_name", "_created_at")
+
     def __init__(self, id: int, name: str, created_at: float):
         self._id: int = id  # User.id = Team.id
         self._name: str = name
@@ -121,51 +164,159 @@ class Team:
         return await User.get(self._id)
     
     async def change_name(self, new_name: str):
-        await db.teams.update_one({"_id": self._id}, {"$set": {"name": new_name}})
+        try:
+            await db.teams.update_one({"_id": self._id}, {"$set": {"name": new_name}})
+        except DuplicateKeyError as e:
+            # atomic with the unique index on teams.name, like in Team.create
+            if "name" in (e.details or {}).get("keyPattern", {}):
+                raise TeamAlreadyExistsException(new_name) from e
+            raise
         self._name = new_name
+        teams_cache.set(self._id, self)
+        team_index.add(self._id, new_name)
+        await publish_invalidation("teams", self._id)
 
     async def delete(self):
         await db.teams.delete_one({"_id": self._id})
+        teams_cache.set(self._id, None)
+        team_index.remove(self._id)
+        await publish_invalidation("teams", self._id)
+
+    @classmethod
+    async def delete_cascade(cls, id: int) -> list[str]:
+        return await cls.delete_cascade_many([id])
+
+    @classmethod
+    async def delete_cascade_many(cls, ids: list[int]) -> list[str]:
+        # deletes the teams and all reminders of their owners, in a transaction when the db supports it;
+        # idempotent, so a retry after a crash midway finishes the job. Returns job ids of the deleted reminders
+        async def cascade(session=None):
+            reminders = await db.reminders.find(
+                {"receiver_id": {"$in": ids}}, {"job_id": 1, "remind_at": 1, "type": 1}, session=session
+            ).to_list(None)
+            await db.reminders.delete_many({"receiver_id": {"$in": ids}}, session=session)
+            await db.teams.delete_many({"_id": {"$in": ids}}, session=session)
+            return reminders
+
+        if await supports_transactions():
+            async with await client.start_session() as session:
+                reminders = await session.with_transaction(cascade)
+        else:
+            reminders = await cascade()
+
+        for reminder in reminders:
+            reminder_timeline.remove(reminder["remind_at"], reminder["type"])
+        for id in ids:
+            teams_cache.set(id, None)
+            team_index.remove(id)
+        await publish_invalidations("teams", ids)
+        return [reminder["job_id"] for reminder in reminders if reminder.get("job_id")]
 
     @classmethod
     async def get(cls, id: int = -1, name: str = None):
         if name:
             team = await db.teams.find_one({"name": name})
-        else:
-            team = await db.teams.find_one({"_id": id})
+            return cls.from_doc(team) if team else None
 
-        if not team:
-            return None
+        team = teams_cache.get(id)
+        if team is not MISSING:
+            return team
 
-        return cls.from_doc(team)
+        doc = await db.teams.find_one({"_id": id})
+        team = cls.from_doc(doc) if doc else None
+        teams_cache.set(id, team)
+        return team
     
     @classmethod
-    async def find(cls, query: dict = {}, page: int = 0, count: int = Config.ITEMS_PER_PAGE):
-        teams = []
-        async for doc in db.teams.find(query).skip(page * count).limit(count):
-            teams.append(cls.from_doc(doc))
-        return teams
+    async def stream(cls, query: dict = {}, projection: dict = None, sort: list = None):
+        async for doc in db.teams.find(query, projection, sort=sort):
+            yield cls.from_doc(doc)
+
+    @classmethod
+    async def find(cls, query: dict = {}, page: int = 0, count: int = Config.ITEMS_PER_PAGE, projection: dict = None):
+        return [cls.from_doc(doc) async for doc in db.teams.find(query, projection).skip(page * count).limit(count)]
     
     @classmethod
     async def create(cls, id: int, name: str):
-        if await db.teams.find_one({"name": name}):
-            raise TeamAlreadyExistsException(name)
-
-        team = {"_id": id, "name": name, "created_at": time()}
-        await db.teams.insert_one(team)
+        team_data = {"_id": id, "name": name, "created_at": time()}
+        try:
+            await db.teams.insert_one(team_data)
+        except DuplicateKeyError as e:
+            # the unique index on teams.name makes this check atomic (see bot.db.ensure_indexes)
+            if "name" in (e.details or {}).get("keyPattern", {}):
+                raise TeamAlreadyExistsException(name) from e
+            raise
+
+        team = cls.from_doc(team_data)
+        teams_cache.set(id, team)
+        team_index.add(id, name)
+        await publish_invalidation("teams", id)
+        return team
 
-        return cls.from_doc(team)
+    @classmethod
+    async def create_many(cls, teams: list[tuple[int, str]]) -> tuple[list, list[int]]:
+        # one unordered insert_many; a team whose owner already has one or whose name is taken (unique indexes)
+        # is skipped and the rest are created. Returns (created teams, positions of the skipped ones in `teams`);
+        # positions and not owner ids, since the same owner may come twice and only the second one fails
+        now = time()
+        docs = [{"_id": id, "name": name, "created_at": now} for id, name in teams]
+        skipped = set()
+        try:
+            await db.teams.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details["writeErrors"]
+            if any(error["code"] != 11000 for error in errors):
+                raise
+            skipped = {error["index"] for error in errors}
+
+        created = [cls.from_doc(doc) for i, doc in enumerate(docs) if i not in skipped]
+        for team in created:
+            teams_cache.set(team.id, team)
+            team_index.add(team.id, team.name)
+        await publish_invalidations("teams", [team.id for team in created])
+        return created, sorted(skipped)
     
+    @classmethod
+    async def find_page(
+        cls,
+        after: tuple[float, int] = None,
+        before: tuple[float, int] = None,
+        count: int = Config.ITEMS_PER_PAGE
+    ) -> tuple[list, bool, bool]:
+        # keyset pagination on (created_at, _id): unlike skip, every page costs the same index seek
+        # returns (teams, has_prev, has_next)
+        sort = [("created_at", 1), ("_id", 1)]
+        query = {}
+        if after:
+            query = {"$or": [{"created_at": {"$gt": after[0]}}, {"created_at": after[0], "_id": {"$gt": after[1]}}]}
+        elif before:
+            query = {"$or": [{"created_at": {"$lt": before[0]}}, {"created_at": before[0], "_id": {"$lt": before[1]}}]}
+            sort = [("created_at", -1), ("_id", -1)]
+
+        # the page buttons need only the names and the cursor fields
+        docs = await db.teams.find(query, {"name": 1, "created_at": 1}).sort(sort).limit(count + 1).to_list(None)
+        has_more = len(docs) > count
+        teams = [cls.from_doc(doc) for doc in docs[:count]]
+
+        if before:
+            teams.reverse()
+            return teams, has_more, True
+        return teams, after is not None, has_more
+
     @classmethod
     async def get_count(cls, query: dict = {}):
+        if not query:
+            # collection metadata, no scan; may be slightly off after an unclean shutdown, fine for display
+            return await db.teams.estimated_document_count()
         return await db.teams.count_documents(query)
     
     @classmethod
     def from_doc(cls, data: dict):
+        # name and created_at may be projected out (bot.broadcast reads ids only)
         return cls(
             id=data["_id"],
-            name=data["name"],
-            created_at=data["created_at"]
+            name=data.get("name"),
+            created_at=data.get("created_at")
         )
     
     @property
@@ -182,7 +333,9 @@ class Team:
     
 
 class Request:
-    
+
+    __slots__ = ("_id", "_sender", "_team_name", "_status", "_approval_info", "_created_at")
+
     def __init__(
             self,
             id: ObjectId,
@@ -199,26 +352,66 @@ class Request:
         self._approval_info: dict = approval_info
         self._created_at: float = created_at
 
-    async def _change_status(self, new_status: RequestStatus, new_approval_info: dict = None):
-        self._status = new_status
-        if new_approval_info:
-            self._approval_info = new_approval_info
+    async def _change_status(self, new_status: RequestStatus, new_approval_info: dict) -> bool:
+        # one round trip, conditional on the request being pending, so of two admins confirming at once only one
+        # gets True. Either way this object ends up with the request as it is in the db
+        doc = await db.requests.find_one_and_update(
+            {"_id": self._id, "status": RequestStatus.PENDING.value},
+            {"$set": {"status": new_status.value, "approval_info": new_approval_info}},
+            return_document=ReturnDocument.AFTER
+        )
+        changed = doc is not None
+        if not changed:
+            doc = await db.requests.find_one({"_id": self._id}, {"status": 1, "approval_info": 1})
+        if doc:
+            self._status = REQUEST_STATUSES.get(doc["status"])
+            self._approval_info = doc.get("approval_info", {})
+        return changed
 
-        await db.requests.update_one(
-            {"_id": self._id},
-            {
-                "$set": {
-                    "status": self._status.value,
-                    "approval_info": self._approval_info
-                }
-            }
+    async def approve(self, approved_by: int, approved_at: int) -> bool:
+        return await self._change_status(RequestStatus.APPROVED, {"by": approved_by, "at": approved_at})
+
+    async def decline(self, declined_by: int, declined_at: int) -> bool:
+        return await self._change_status(RequestStatus.DECLINED, {"by": declined_by, "at": declined_at})
+
+    @classmethod
+    async def _change_status_many(cls, ids: list[ObjectId | str], new_status: RequestStatus, by: int, at: int) -> list:
+        # only requests still pending are changed, so two admins never both process one; the batch id
+        # tells which ones this call changed. Returns them
+        batch = ObjectId()
+        await db.requests.update_many(
+            {"_id": {"$in": [ObjectId(id) for id in ids]}, "status": RequestStatus.PENDING.value},
+            {"$set": {"status": new_status.value, "approval_info": {"by": by, "at": at, "batch": batch}}}
         )
+        return [cls.from_doc(doc) async for doc in db.requests.find({"approval_info.batch": batch}).sort("created_at", 1)]
 
-    async def approve(self, approved_by: int, approved_at: int):
-        await self._change_status(RequestStatus.APPROVED, {"by": approved_by, "at": approved_at})
-        
-    async def decline(self, declined_by: int, declined_at: int):
-        await self._change_status(RequestStatus.DECLINED, {"by": declined_by, "at": declined_at})
+    @classmethod
+    async def approve_many(cls, ids: list[ObjectId | str], approved_by: int, approved_at: int) -> list:
+        return await cls._change_status_many(ids, RequestStatus.APPROVED, approved_by, approved_at)
+
+    @classmethod
+    async def decline_many(cls, ids: list[ObjectId | str], declined_by: int, declined_at: int) -> list:
+        return await cls._change_status_many(ids, RequestStatus.DECLINED, declined_by, declined_at)
+
+    @classmethod
+    async def reopen_many(cls, ids: list[ObjectId]):
+        # back to pending, e.g. approved requests whose team couldn't be created
+        await db.requests.update_many(
+            {"_id": {"$in": ids}},
+            {"$set": {"status": RequestStatus.PENDING.value, "approval_info": {"by": None, "at": None}}}
+        )
+
+    @classmethod
+    async def find_pending(cls, count: int = Config.ITEMS_PER_PAGE) -> list:
+        # oldest first
+        return [
+            cls.from_doc(doc)
+            async for doc in db.requests.find({"status": RequestStatus.PENDING.value}).sort("created_at", 1).limit(count)
+        ]
+
+    @classmethod
+    async def get_pending_count(cls) -> int:
+        return await db.requests.count_documents({"status": RequestStatus.PENDING.value})
 
     @classmethod
     async def get(cls, id: ObjectId | str):
@@ -246,13 +439,14 @@ class Request:
     
     @classmethod
     def from_doc(cls, data: dict):
+        # only team_name is read by every projection (the start command reads nothing else)
         return cls(
             id=data["_id"],
-            sender=data["sender"],
+            sender=data.get("sender"),
             team_name=data["team_name"],
-            status=RequestStatus[data["status"].upper()],
+            status=REQUEST_STATUSES.get(data.get("status")),
             approval_info=data.get("approval_info", {}),
-            created_at=data["created_at"]
+            created_at=data.get("created_at")
         )
     
     @property
@@ -282,6 +476,8 @@ class Request:
 
 class Reminder:
 
+    __slots__ = ("_id", "_job_id", "_receiver_id", "_type", "_remind_at", "_created_at")
+
     def __init__(
             self,
             id: str,
@@ -300,15 +496,21 @@ class Reminder:
 
     async def reschedule(self, remind_at: datetime, with_job: bool = True):
         self._remind_at = remind_at.timestamp()
-        await db.reminders.update_one({"_id": self._id}, {"$set": {"remind_at": self._remind_at}})
+        # the old values come from the db, this object may be stale or projected
+        old = await db.reminders.find_one_and_update(
+            {"_id": self._id}, {"$set": {"remind_at": self._remind_at}}, {"remind_at": 1, "type": 1}
+        )
+        if old:
+            reminder_timeline.move(old["remind_at"], self._remind_at, old["type"])
         if with_job:
-            if job := scheduler.get_job(self._job_id):
+            if job := await get_job(self._job_id):
                 job.reschedule(trigger="date", run_date=remind_at)
 
     async def delete(self, with_job: bool = False):
-        await db.reminders.delete_one({"_id": self._id})
+        if old := await db.reminders.find_one_and_delete({"_id": self._id}, {"remind_at": 1, "type": 1}):
+            reminder_timeline.remove(old["remind_at"], old["type"])
         if with_job:
-            if job := scheduler.get_job(self._job_id):
+            if job := await get_job(self._job_id):
                 job.remove()
 
     @classmethod
@@ -321,7 +523,13 @@ class Reminder:
             "remind_at": remind_at,
             "created_at": time()
         }
-        await db.reminders.insert_one(reminder)
+        # counted before the insert, so reminders scheduled concurrently see each other (bot.jobs.reminder._pick_run_date)
+        reminder_timeline.add(remind_at, type.value)
+        try:
+            await db.reminders.insert_one(reminder)
+        except Exception:
+            reminder_timeline.remove(remind_at, type.value)
+            raise
         return cls.from_doc(reminder)
     
     @classmethod
@@ -329,16 +537,73 @@ class Reminder:
         reminder = await db.reminders.find_one({"_id": id})
         if reminder:
             return cls.from_doc(reminder)
+
+    @classmethod
+    async def stream(cls, query: dict = {}, projection: dict = None):
+        async for doc in db.reminders.find(query, projection):
+            yield cls.from_doc(doc)
+
+    @classmethod
+    async def shift_many(cls, receiver_ids: list[int], delta: timedelta) -> int:
+        # moves all reminders of these users by delta in one update_many; those being sent right now (claimed) stay
+        docs = await db.reminders.find(
+            {"receiver_id": {"$in": receiver_ids}, "claim": {"$exists": False}}, {"job_id": 1, "remind_at": 1, "type": 1}
+        ).to_list(None)
+        if not docs:
+            return 0
+
+        seconds = delta.total_seconds()
+        ids = [doc["_id"] for doc in docs]
+        result = await db.reminders.update_many({"_id": {"$in": ids}, "claim": {"$exists": False}}, {"$inc": {"remind_at": seconds}})
+        if result.modified_count < len(docs):
+            # claimed between the find and the update, those are left as is like the ones claimed before
+            unclaimed = {doc["_id"] async for doc in db.reminders.find({"_id": {"$in": ids}, "claim": {"$exists": False}}, {"_id": 1})}
+            docs = [doc for doc in docs if doc["_id"] in unclaimed]
+        for doc in docs:
+            remind_at = doc["remind_at"] + seconds
+            reminder_timeline.move(doc["remind_at"], remind_at, doc["type"])
+            if doc.get("job_id"):
+                if job := await get_job(doc["job_id"]):
+                    job.reschedule(trigger="date", run_date=datetime.fromtimestamp(remind_at))
+        return len(docs)
+
+    @classmethod
+    async def pop(cls, id: str):
+        # get + delete in one atomic op, so a reminder is sent only by whoever popped it
+        reminder = await db.reminders.find_one_and_delete({"_id": id})
+        if reminder:
+            reminder_timeline.remove(reminder["remind_at"], reminder["type"])
+            return cls.from_doc(reminder)
+
+    @classmethod
+    async def claim_due(cls, now: float, limit: int):
+        # claimed reminders are left to the dispatcher that claimed them, so two dispatchers running at once (a leader
+        # failover, see bot.leader) never get the same reminder. Each one is deleted once it's delivered, so those
+        # claimed by a dispatcher that crashed are sent again when the claim expires
+        unclaimed = {"$or": [{"claimed_at": {"$exists": False}}, {"claimed_at": {"$lt": now - Config.REMINDER_CLAIM_TIMEOUT}}]}
+        due = {"remind_at": {"$lte": now}, **unclaimed}
+        ids = [doc["_id"] for doc in await db.reminders.find(due, {"_id": 1}).sort("remind_at", 1).limit(limit).to_list(None)]
+        if not ids:
+            return []
+
+        claim = ObjectId()
+        await db.reminders.update_many({"_id": {"$in": ids}, **unclaimed}, {"$set": {"claim": claim, "claimed_at": time()}})
+        # what the dispatcher needs to deliver them
+        docs = await db.reminders.find(
+            {"claim": claim}, {"job_id": 1, "receiver_id": 1, "type": 1, "remind_at": 1}
+        ).sort("remind_at", 1).to_list(None)
+        return [cls.from_doc(doc) for doc in docs]
     
     @classmethod
     def from_doc(cls, data: dict):
+        # type and remind_at are in every projection (the reminder lists read only those)
         return cls(
             id=data["_id"],
-            job_id=data["job_id"],
-            receiver_id=data["receiver_id"],
-            type=ReminderType[data["type"].upper()],
+            job_id=data.get("job_id"),
+            receiver_id=data.get("receiver_id"),
+            type=REMINDER_TYPES[data["type"]],
             remind_at=data["remind_at"],
-            created_at=data["created_at"]
+            created_at=data.get("created_at")
         )
     
     @property
@@ -361,6 +626,190 @@ class Reminder:
     def remind_at(self) -> float:
         return self._remind_at
     
+    @property
+    def created_at(self) -> float:
+        return self._created_at
+
+
+class Broadcast:
+    """
+    A message from an admin to every team owner (see bot.broadcast). Recipients are sent to in team id order,
+    `last_recipient_id` is the checkpoint to resume from; `blocked` collects the owners who blocked the bot,
+    their teams are deleted in one go when the broadcast is over.
+    """
+
+    __slots__ = (
+        "_id", "_text", "_admin_id", "_message_id", "_status", "_last_recipient_id",
+        "_total", "_sent", "_failed", "_blocked", "_created_at"
+    )
+
+    def __init__(
+            self,
+            id: ObjectId,
+            text: str,
+            admin_id: int,
+            message_id: int,
+            status: BroadcastStatus,
+            last_recipient_id: int | None,
+            total: int,
+            sent: int,
+            failed: int,
+            blocked: list[int],
+            created_at: float
+        ):
+        self._id: ObjectId = id
+        self._text: str = text
+        self._admin_id: int = admin_id  # the progress message is in the admin's chat
+        self._message_id: int = message_id
+        self._status: BroadcastStatus = status
+        self._last_recipient_id: int | None = last_recipient_id
+        self._total: int = total
+        self._sent: int = sent
+        self._failed: int = failed
+        self._blocked: list[int] = blocked
+        self._created_at: float = created_at
+
+    async def checkpoint(self, last_recipient_id: int, sent: int, failed: int, blocked: list[int]) -> bool:
+        # returns False if the broadcast was cancelled or taken over by another worker meanwhile
+        result = await db.broadcasts.update_one(
+            {"_id": self._id, "status": BroadcastStatus.RUNNING.value, "worker": WORKER_ID},
+            {
+                "$set": {"last_recipient_id": last_recipient_id, "updated_at": time()},
+                "$inc": {"sent": sent, "failed": failed},
+                "$push": {"blocked": {"$each": blocked}}
+            }
+        )
+        self._last_recipient_id = last_recipient_id
+        self._sent += sent
+        self._failed += failed
+        self._blocked.extend(blocked)
+        if not result.matched_count:
+            self._status = (await Broadcast.get(self._id) or self)._status
+            return False
+        return True
+
+    async def heartbeat(self) -> bool:
+        # marks the broadcast alive between checkpoints, a batch behind other sends can take longer than the stale
+        # timeout; returns False if the broadcast was cancelled or taken over by another worker meanwhile
+        result = await db.broadcasts.update_one(
+            {"_id": self._id, "status": BroadcastStatus.RUNNING.value, "worker": WORKER_ID},
+            {"$set": {"updated_at": time()}}
+        )
+        return result.matched_count == 1
+
+    async def finish(self):
+        await db.broadcasts.update_one(
+            {"_id": self._id, "status": BroadcastStatus.RUNNING.value, "worker": WORKER_ID},
+            {"$set": {"status": BroadcastStatus.DONE.value, "updated_at": time()}}
+        )
+        self._status = BroadcastStatus.DONE
+
+    @classmethod
+    async def cancel(cls, id: ObjectId | str) -> bool:
+        if isinstance(id, str):
+            id = ObjectId(id)
+        result = await db.broadcasts.update_one(
+            {"_id": id, "status": BroadcastStatus.RUNNING.value},
+            {"$set": {"status": BroadcastStatus.CANCELLED.value, "updated_at": time()}}
+        )
+        return result.modified_count == 1
+
+    @classmethod
+    async def get(cls, id: ObjectId | str):
+        if isinstance(id, str):
+            id = ObjectId(id)
+        broadcast = await db.broadcasts.find_one({"_id": id})
+        if broadcast:
+            return cls.from_doc(broadcast)
+
+    @classmethod
+    async def create(cls, text: str, admin_id: int, message_id: int, total: int):
+        now = time()
+        broadcast = {
+            "text": text,
+            "admin_id": admin_id,
+            "message_id": message_id,
+            "status": BroadcastStatus.RUNNING.value,
+            "last_recipient_id": None,
+            "total": total,
+            "sent": 0,
+            "failed": 0,
+            "blocked": [],
+            "worker": WORKER_ID,
+            "created_at": now,
+            "updated_at": now
+        }
+        insert_result = await db.broadcasts.insert_one(broadcast)
+        broadcast["_id"] = insert_result.inserted_id
+        return cls.from_doc(broadcast)
+
+    @classmethod
+    async def claim_orphaned(cls, stale_before: float, exclude: list[ObjectId]):
+        # takes over a running broadcast whose worker stopped its heartbeat (a restart or a crash)
+        broadcast = await db.broadcasts.find_one_and_update(
+            {"status": BroadcastStatus.RUNNING.value, "updated_at": {"$lt": stale_before}, "_id": {"$nin": exclude}},
+            {"$set": {"worker": WORKER_ID, "updated_at": time()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if broadcast:
+            return cls.from_doc(broadcast)
+
+    @classmethod
+    def from_doc(cls, data: dict):
+        return cls(
+            id=data["_id"],
+            text=data["text"],
+            admin_id=data["admin_id"],
+            message_id=data["message_id"],
+            status=BROADCAST_STATUSES[data["status"]],
+            last_recipient_id=data["last_recipient_id"],
+            total=data["total"],
+            sent=data["sent"],
+            failed=data["failed"],
+            blocked=data["blocked"],
+            created_at=data["created_at"]
+        )
+
+    @property
+    def id(self) -> ObjectId:
+        return self._id
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def admin_id(self) -> int:
+        return self._admin_id
+
+    @property
+    def message_id(self) -> int:
+        return self._message_id
+
+    @property
+    def status(self) -> BroadcastStatus:
+        return self._status
+
+    @property
+    def last_recipient_id(self) -> int | None:
+        return self._last_recipient_id
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+    @property
+    def sent(self) -> int:
+        return self._sent
+
+    @property
+    def failed(self) -> int:
+        return self._failed
+
+    @property
+    def blocked(self) -> list[int]:
+        return self._blocked
+
     @property
     def created_at(self) -> float:
         return self._created_at
\ No newline at end of file
@@ -9,6 +9,8 @@ admin_router = Router(name=__name__)
 
 admin_router.message.middleware(AdminMiddleware())
 admin_router.callback_query.middleware(AdminMiddleware())
+admin_router.inline_query.middleware(AdminMiddleware())
 
-admin_router.include_router(approval_router)
-admin_router.include_router(menu_router)
\ No newline at end of file
+# the menu goes first: its broadcast text input must see the message before stateless handlers like "запити"
+admin_router.include_router(menu_router)
+admin_router.include_router(approval_router)
\ No newline at end of file
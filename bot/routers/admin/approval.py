@@ -3,9 +3,14 @@ from aiogram.exceptions import TelegramForbiddenError
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+import asyncio
 
+from bot.exceptions import TeamAlreadyExistsException
 from bot.models import Team, Request
+from bot.utils import get_chat
 from bot.models.enums import RequestStatus
+from bot.keyboards.admin import requests_queue_kb
 from bot.keyboards.common import confirmation_kb, request_approval_kb, set_reminders_kb
 
 
@@ -15,6 +20,9 @@ approval_router = Router(name=__name__)
 class Approval(StatesGroup):
     confirm = State()
 
+class RequestsQueue(StatesGroup):
+    selecting = State()
+
 
 async def send_approval_notificaition(request: Request, bot: Bot):
     reply_markup = None
@@ -45,8 +53,12 @@ async def send_approval_notificaition(request: Request, bot: Bot):
         )
 
 async def generate_request_info(request: Request, bot: Bot) -> str:
-    approver_chat = await bot.get_chat(request.approval_info["by"])
-    sender_chat = await bot.get_chat(request.sender)
+    if request.status == RequestStatus.PENDING:
+        # no approver yet, e.g. the request was put back after a failed approval
+        return f"⏳ <i>Рішення щодо <b>{request.team_name}</b> ще не прийнято!</i>"
+
+    approver_chat = await get_chat(bot, request.approval_info["by"])
+    sender_chat = await get_chat(bot, request.sender)
     approved_time = datetime.fromtimestamp(request.approval_info["at"]).isoformat(sep=" ", timespec="minutes")
 
     match request.status:
@@ -54,8 +66,6 @@ async def generate_request_info(request: Request, bot: Bot) -> str:
             text = f"✅ <i>Запит на реєстрацію <b>{request.team_name}</b> (@{sender_chat.username}) було прийнято @{approver_chat.username} {approved_time}!</i>"
         case RequestStatus.DECLINED:
             text = f"⛔️ <i>Запит на реєстрацію <b>{request.team_name}</b> (@{sender_chat.username}) було відхилено @{approver_chat.username} {approved_time}!</i>"
-        case RequestStatus.PENDING:
-            text = f"⏳ <i>Рішення щодо <b>{request.team_name}</b> ще не прийнято!</i>"
         case _:
             text = f"⚠️ <b>UNSUPPORTED REQUEST STATUS: {request.status}</b>"
 
@@ -65,7 +75,7 @@ async def generate_request_info(request: Request, bot: Bot) -> str:
 @approval_router.callback_query(F.data.startswith("request"), Approval.confirm)
 async def block_approve_request(callback: types.CallbackQuery, state: FSMContext):
     data = await state.get_data()
-    request = data.get("request")
+    request = await Request.get(data["request_id"]) if data.get("request_id") else None
     if request:
         await callback.answer(f"❗️ Спочатку підтвердь дію для команди {request.team_name}!")
     else:
@@ -77,7 +87,7 @@ async def approve_request(callback: types.CallbackQuery, state: FSMContext):
     _, action, request_id = callback.data.split(":")
     request = await Request.get(request_id)
 
-    await state.update_data(request_message_text=message.text, request=request, approval_action=action)
+    await state.update_data(request_message_text=message.text, request_id=request_id, approval_action=action)
     await state.set_state(Approval.confirm)
 
     if action == "approve":
@@ -90,28 +100,125 @@ async def approve_request(callback: types.CallbackQuery, state: FSMContext):
 @approval_router.callback_query(Approval.confirm, F.data == "confirm")
 async def confirm_request_approval(callback: types.CallbackQuery, bot: Bot, state: FSMContext):
     data = await state.get_data()
+    await state.set_state(None)
 
-    # update the request data to check if it's still pending and not approved/declined by someone else
-    request = await Request.get(data["request"].id)
-    if request.status == RequestStatus.PENDING:
-        by, at = callback.from_user.id, int(datetime.now().timestamp())
-        if data["approval_action"] == "approve":
-            await request.approve(approved_by=by, approved_at=at)
+    request = await Request.get(data["request_id"])
+    if not request:
+        await callback.message.edit_text("⚠️ Запит не знайдено!")
+        return
+
+    # approve/decline change the request only if it's still pending (atomically), so when admins confirm at once
+    # only one of them creates the team and notifies the user, the others just see the outcome
+    by, at = callback.from_user.id, int(datetime.now().timestamp())
+    if data["approval_action"] == "approve":
+        changed = await request.approve(approved_by=by, approved_at=at)
+    else:
+        changed = await request.decline(declined_by=by, declined_at=at)
+
+    if changed and request.status == RequestStatus.APPROVED:
+        try:
             await Team.create(request.sender, request.team_name)
-        else:
-            await request.decline(declined_by=by, declined_at=at)
+        except (TeamAlreadyExistsException, DuplicateKeyError):
+            # the name is taken or the user already has a team (unique indexes), back to the queue for a decision
+            await Request.reopen_many([request.id])
+            await callback.message.edit_text(
+                f"⚠️ Не вдалося створити команду <b>{request.team_name}</b>: назва зайнята або користувач вже має команду. "
+                "Запит повернуто в очікування.",
+                reply_markup=request_approval_kb(data["request_id"])
+            )
+            return
+
+    if changed:
         await send_approval_notificaition(request, bot)
 
     request_info = await generate_request_info(request, bot)
     await callback.message.edit_text(request_info)
-    await state.set_state(None)
 
 @approval_router.callback_query(Approval.confirm, F.data == "back")
 async def cancel_request_approval(callback: types.CallbackQuery, state: FSMContext):
     data = await state.get_data()
     request_message_text = data["request_message_text"]
-    request = data["request"]
 
-    await callback.message.edit_text(request_message_text, reply_markup=request_approval_kb(str(request.id)))
+    await callback.message.edit_text(request_message_text, reply_markup=request_approval_kb(data["request_id"]))
+
+    await state.set_state(None)
+
+
+# ======== REQUESTS QUEUE ========
+# pending requests with multi-select, approved or declined all at once
+async def render_requests_queue(selected: list[str]) -> tuple[str, types.InlineKeyboardMarkup]:
+    requests = await Request.find_pending()
+    total_count = await Request.get_pending_count()
+    text = f"Запити, що очікують рішення: {total_count} \n\nВиберіть запити та дію для них."
+    return text, requests_queue_kb(requests, set(selected))
+
+@approval_router.message(F.text.lower() == "запити")
+async def show_requests_queue(message: types.Message, state: FSMContext):
+    await state.set_state(RequestsQueue.selecting)
+    await state.update_data(selected_requests=[])
+
+    text, reply_markup = await render_requests_queue([])
+    await message.answer(text, reply_markup=reply_markup)
+
+@approval_router.callback_query(RequestsQueue.selecting, F.data.startswith("queue:toggle:"))
+async def toggle_queued_request(callback: types.CallbackQuery, state: FSMContext):
+    request_id = callback.data.split(":")[-1]
+    selected = (await state.get_data()).get("selected_requests", [])
+    if request_id in selected:
+        selected.remove(request_id)
+    else:
+        selected.append(request_id)
+    await state.update_data(selected_requests=selected)
+
+    text, reply_markup = await render_requests_queue(selected)
+    await callback.message.edit_text(text, reply_markup=reply_markup)
+
+@approval_router.callback_query(RequestsQueue.selecting, F.data == "queue:all")
+async def toggle_all_queued_requests(callback: types.CallbackQuery, state: FSMContext):
+    shown = [str(r.id) for r in await Request.find_pending()]
+    selected = (await state.get_data()).get("selected_requests", [])
+    selected = [] if set(shown) <= set(selected) else shown
+    await state.update_data(selected_requests=selected)
+
+    text, reply_markup = await render_requests_queue(selected)
+    await callback.message.edit_text(text, reply_markup=reply_markup)
+
+@approval_router.callback_query(RequestsQueue.selecting, F.data.in_({"queue:approve", "queue:decline"}))
+async def resolve_queued_requests(callback: types.CallbackQuery, bot: Bot, state: FSMContext):
+    selected = (await state.get_data()).get("selected_requests", [])
+    if not selected:
+        await callback.answer("⚠️ Нічого не вибрано!")
+        return
+
+    # requests already handled by another admin are skipped by the model (conditional on status=pending)
+    by, at = callback.from_user.id, int(datetime.now().timestamp())
+    skipped_names = []
+    if callback.data == "queue:approve":
+        requests = await Request.approve_many(selected, approved_by=by, approved_at=at)
+        _, skipped_indexes = await Team.create_many([(r.sender, r.team_name) for r in requests])
+        if skipped_indexes:
+            # the owner already has a team or the name is taken, left for a decision one by one
+            skipped = [requests[i] for i in skipped_indexes]
+            await Request.reopen_many([r.id for r in skipped])
+            skipped_names = [r.team_name for r in skipped]
+            requests = [r for i, r in enumerate(requests) if i not in skipped_indexes]
+        text = f"✅ Прийнято: {len(requests)}"
+    else:
+        requests = await Request.decline_many(selected, declined_by=by, declined_at=at)
+        text = f"⛔️ Відхилено: {len(requests)}"
+
+    await asyncio.gather(*(send_approval_notificaition(request, bot) for request in requests))
+
+    if already_handled := len(selected) - len(requests) - len(skipped_names):
+        text += f"\nВже оброблені іншим адміном: {already_handled}"
+    if skipped_names:
+        text += f"\n⚠️ Не вдалося створити (назва зайнята або команда вже є): {', '.join(skipped_names)}"
+
+    await state.update_data(selected_requests=[])
+    queue_text, reply_markup = await render_requests_queue([])
+    await callback.message.edit_text(f"{text} \n\n{queue_text}", reply_markup=reply_markup)
 
+@approval_router.callback_query(RequestsQueue.selecting, F.data == "queue:exit")
+async def exit_requests_queue(callback: types.CallbackQuery, state: FSMContext):
+    await callback.message.delete()
     await state.set_state(None)
@@ -1,15 +1,19 @@
 from aiogram import Bot, Router, types, F
-from aiogram.filters import or_f
+from aiogram.filters import or_f, Command, CommandObject
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
-from datetime import datetime
+from datetime import datetime, timedelta
+from time import time
 
 from bot.config import Config
 from bot.keyboards.admin import team_list_kb, team_info_kb, team_reminders_kb, admin_menu, admin_users_menu
 from bot.keyboards.common import confirmation_kb, cancel_kb
-from bot.utils import ts_to_strdt, chat_to_str, delete_team, notify_user
-from bot.models import User, Team, Reminder
-from bot.models.enums import ReminderType, Role
+from bot.utils import ts_to_dt, ts_to_strdt, chat_to_str, get_chat, delete_team, notify_user
+from bot.models import User, Team, Reminder, Broadcast
+from bot.models.enums import ReminderType, Role, REMINDER_TYPES
+from bot.search import team_index
+from bot.broadcast import start_broadcast
+from bot.timeline import reminder_timeline
 
 
 menu_router = Router(name=__name__)
@@ -30,6 +34,40 @@ class UsersMenu(StatesGroup):
     confirm_ban = State()
     confirm_unban = State()
 
+class BroadcastMenu(StatesGroup):
+    input_text = State()
+    confirm = State()
+
+
+async def render_teams_list(cursor: str | None) -> tuple[str, types.InlineKeyboardMarkup]:
+    # cursor is the data of the pressed page button (see team_list_kb), None for the first page
+    after = before = None
+    if cursor:
+        direction, created_at, team_id = cursor.split(":")
+        if direction == "next":
+            after = (float(created_at), int(team_id))
+        else:
+            before = (float(created_at), int(team_id))
+
+    teams, has_prev, has_next = await Team.find_page(after=after, before=before)
+    total_count = await Team.get_count()
+    text = f"Загальна кількість команд: {total_count} \n\nВиберіть команду, щоб перейти до її редагування."
+    return text, team_list_kb(teams, has_prev, has_next)
+
+async def get_selected_team(state: FSMContext) -> tuple[Team, User]:
+    # only the team id is kept in the FSM data; User.id = Team.id
+    team_id = (await state.get_data())["team_id"]
+    return await Team.get(team_id), await User.get(team_id)
+
+
+# registered before the stateless text and command handlers below, so a broadcast
+# text like "розклад" or "/find" is taken as the message and not as a menu action
+@menu_router.message(BroadcastMenu.input_text, F.text)
+async def confirm_broadcast(message: types.Message, state: FSMContext):
+    total_count = await Team.get_count()
+    await state.update_data(broadcast_text=message.html_text)
+    await state.set_state(BroadcastMenu.confirm)
+    await message.answer(f"Надіслати це повідомлення {total_count} власникам команд? \n\n{message.html_text}", reply_markup=confirmation_kb)
 
 @menu_router.message(RemindersMenu.reschedule, F.text)
 async def set_new_time(message: types.Message, state: FSMContext):
@@ -40,11 +78,12 @@ async def set_new_time(message: types.Message, state: FSMContext):
         return
     
     data = await state.get_data()
-    reminder = data["reminder"]
-    await reminder.reschedule(dt)
+    reminder = await Reminder.get(data["reminder_id"])
+    if reminder:
+        await reminder.reschedule(dt)
 
-    reminders = await data["owner"].get_reminders()
-    team = data["team"]
+    team, owner = await get_selected_team(state)
+    reminders = await owner.get_reminders({"type": 1, "remind_at": 1})
     text = f"Нагадування для команди <b>{team.name}</b> \n\n"
     for r in reminders:
         text += f"{ReminderType.to_ukr(r.type).upper()} – {ts_to_strdt(r.remind_at)}\n"
@@ -61,22 +100,35 @@ async def input_new_time(callback: types.CallbackQuery, state: FSMContext):
         return
     
     await state.set_state(RemindersMenu.reschedule)
-    await state.update_data(reminder=reminder)
+    await state.update_data(reminder_id=reminder.id)
 
     await callback.message.edit_text(
         "Введіть новий час у форматі ГГ:ХХ ДД-ММ-РРРР (напр 15:07 15-01-2024)",
         reply_markup=cancel_kb
     )
 
+@menu_router.message(Command("shift"))
+async def shift_reminders(message: types.Message, command: CommandObject):
+    # /shift <hours> <team id> [<team id> ...], hours may be negative
+    try:
+        hours, *team_ids = (command.args or "").split()
+        delta, team_ids = timedelta(hours=float(hours)), [int(team_id) for team_id in team_ids]
+    except ValueError:
+        team_ids = []
+    if not team_ids:
+        await message.answer("Вкажіть зсув у годинах та id команд (напр. /shift -12 123456 789012)")
+        return
+
+    shifted_count = await Reminder.shift_many(team_ids, delta)
+    await message.answer(f"Зсунуто нагадувань: {shifted_count}")
+
 @menu_router.callback_query(RemindersMenu.reschedule, F.data == "cancel")
 @menu_router.callback_query(TeamsMenu.info, F.data == "reminders")
 async def list_reminders(callback: types.CallbackQuery, state: FSMContext):
     await state.set_state(RemindersMenu.listing)
-    data = await state.get_data()
 
-    team = data["team"]
-    owner = data["owner"]
-    reminders = await owner.get_reminders()
+    team, owner = await get_selected_team(state)
+    reminders = await owner.get_reminders({"type": 1, "remind_at": 1})
 
     text = f"Нагадування для команди <b>{team.name}</b> \n\n"
     for r in reminders:
@@ -90,24 +142,18 @@ async def confirm_team_deletion(callback: types.CallbackQuery, bot: Bot, state:
     await state.set_state(TeamsMenu.listing)
 
     data = await state.get_data()
-    team = data["team"]
-    await delete_team(team.id, bot, reason=f"адмін @{callback.from_user.username} вирішив видалити команду")
-    await notify_user(bot, team.id, "❗️ <b>Вашу команду було видалено адміном!</b>")
+    team_id = data["team_id"]
+    await delete_team(team_id, bot, reason=f"адмін @{callback.from_user.username} вирішив видалити команду")
+    await notify_user(bot, team_id, "❗️ <b>Вашу команду було видалено адміном!</b>")
 
-    page = data.get("page", 0)
-    teams = await Team.find(page=page)
-    total_count = await Team.get_count()
-    await callback.message.answer(
-        f"Загальна кількість команд: {total_count} \n\nВиберіть команду, щоб перейти до її редагування.",
-        reply_markup=team_list_kb(teams, total_count, page=page)
-    )
+    text, reply_markup = await render_teams_list(data.get("page_cursor"))
+    await callback.message.answer(text, reply_markup=reply_markup)
 
 @menu_router.callback_query(or_f(TeamsMenu.confirm_deletion, RemindersMenu.listing), F.data == "back")
 async def back_to_team_info(callback: types.CallbackQuery, bot: Bot, state: FSMContext):
     await state.set_state(TeamsMenu.info)
-    data = await state.get_data()
-    team = data["team"]
-    owner_chat = await bot.get_chat(team.id)
+    team, _ = await get_selected_team(state)
+    owner_chat = await get_chat(bot, team.id)
     await callback.message.edit_text(
         f"Команда <b>{team.name}</b> \n\nВласник: {chat_to_str(owner_chat)} \nСтворено: {ts_to_strdt(team.created_at)}",
         reply_markup=team_info_kb
@@ -115,33 +161,27 @@ async def back_to_team_info(callback: types.CallbackQuery, bot: Bot, state: FSMC
 
 @menu_router.callback_query(TeamsMenu.info, F.data == "delete")
 async def handle_delete_team(callback: types.CallbackQuery, state: FSMContext):
-    data = await state.get_data()
+    team, _ = await get_selected_team(state)
     await state.set_state(TeamsMenu.confirm_deletion)
-    await callback.message.edit_text(f"Видалити команду <b>{data['team'].name}</b>?", reply_markup=confirmation_kb)
+    await callback.message.edit_text(f"Видалити команду <b>{team.name}</b>?", reply_markup=confirmation_kb)
 
 @menu_router.callback_query(TeamsMenu.info, F.data == "back")
 async def back_to_teams_list(callback: types.CallbackQuery, state: FSMContext):
-    await state.update_data(team=None, owner=None)
+    await state.update_data(team_id=None)
     await state.set_state(TeamsMenu.listing)
 
     data = await state.get_data()
-    page = data.get("page", 0)
-    teams = await Team.find(page=page)
-    total_count = await Team.get_count()
-
-    await callback.message.edit_text(
-        f"Загальна кількість команд: {total_count} \n\nВиберіть команду, щоб перейти до її редагування.",
-        reply_markup=team_list_kb(teams, total_count, page=page)
-    )
+    text, reply_markup = await render_teams_list(data.get("page_cursor"))
+    await callback.message.edit_text(text, reply_markup=reply_markup)
 
 @menu_router.callback_query(TeamsMenu.listing, F.data.startswith("team:"))
 async def select_team(callback: types.CallbackQuery, bot: Bot, state: FSMContext):
     team_id = int(callback.data.split(":")[-1])
     team = await Team.get(team_id)
     owner = await team.get_owner()
-    owner_chat = await bot.get_chat(owner.id)
+    owner_chat = await get_chat(bot, owner.id)
 
-    await state.update_data(team=team, owner=owner)
+    await state.update_data(team_id=team.id)
     await state.set_state(TeamsMenu.info)
 
     await callback.message.edit_text(
@@ -149,23 +189,11 @@ async def select_team(callback: types.CallbackQuery, bot: Bot, state: FSMContext
         reply_markup=team_info_kb
     )
 
-@menu_router.callback_query(TeamsMenu.listing, (F.data == "next") | (F.data == "prev"))
+@menu_router.callback_query(TeamsMenu.listing, F.data.startswith("next:") | F.data.startswith("prev:"))
 async def teams_list_change_page(callback: types.CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-
-    delta = 1
-    if callback.data == "prev":
-        delta = -1 
-    page = data["page"] + delta
-
-    teams = await Team.find(page=page, count=Config.ITEMS_PER_PAGE)
-    total_count = await Team.get_count()
-
-    await callback.message.edit_text(
-        f"Загальна кількість команд: {total_count} \n\nВиберіть команду, щоб перейти до її редагування.",
-        reply_markup=team_list_kb(teams, total_count, page=page)
-    )
-    await state.update_data(page=page)
+    text, reply_markup = await render_teams_list(callback.data)
+    await callback.message.edit_text(text, reply_markup=reply_markup)
+    await state.update_data(page_cursor=callback.data)
 
 @menu_router.callback_query(TeamsMenu.listing, F.data == "exit")
 async def filter_list_quit(callback: types.CallbackQuery, state: FSMContext):
@@ -175,22 +203,50 @@ async def filter_list_quit(callback: types.CallbackQuery, state: FSMContext):
 @menu_router.message(F.text.lower() == "команди")
 async def list_teams(message: types.Message, bot: Bot, state: FSMContext):
     await state.set_state(TeamsMenu.listing)
-    await state.update_data(page=0)
+    await state.update_data(page_cursor=None)
 
-    teams = await Team.find(page=0)
-    total_count = await Team.get_count()
+    text, reply_markup = await render_teams_list(None)
+    await message.answer(text, reply_markup=reply_markup)
+
+@menu_router.message(Command("find"))
+async def find_teams(message: types.Message, command: CommandObject, state: FSMContext):
+    if not command.args:
+        await message.answer("Введіть частину назви після команди (напр. /find tsuki)")
+        return
+
+    team_ids = team_index.search(command.args, Config.ITEMS_PER_PAGE)
+    if not team_ids:
+        await message.answer("Команд не знайдено!")
+        return
+
+    teams = await Team.find({"_id": {"$in": team_ids}}, projection={"name": 1})
+    teams.sort(key=lambda t: team_ids.index(t.id))
 
+    await state.set_state(TeamsMenu.listing)
+    await state.update_data(page_cursor=None)
     await message.answer(
-        f"Загальна кількість команд: {total_count} \n\nВиберіть команду, щоб перейти до її редагування.",
-        reply_markup=team_list_kb(teams, total_count, page=0)
+        f"Знайдено команд: {len(teams)} \n\nВиберіть команду, щоб перейти до її редагування.",
+        reply_markup=team_list_kb(teams, has_prev=False, has_next=False)
     )
 
+@menu_router.inline_query()
+async def inline_find_teams(inline_query: types.InlineQuery):
+    results = [
+        types.InlineQueryResultArticle(
+            id=str(team_id),
+            title=team_index.name(team_id),
+            input_message_content=types.InputTextMessageContent(message_text=f"/find {team_index.name(team_id)}")
+        )
+        for team_id in team_index.search(inline_query.query, Config.ITEMS_PER_PAGE)
+    ]
+    await inline_query.answer(results, cache_time=5, is_personal=True)
+
 
 # ======== USERS ========
 # TO-DO: refactor this copypaste bs
 async def validate_uid(uid: str, bot: Bot) -> types.Chat | None:
     try:
-        chat = await bot.get_chat(int(uid))
+        chat = await get_chat(bot, int(uid))
     except:
         return None
     if not await User.get(int(uid)):
@@ -202,7 +258,7 @@ async def punish_mortal(callback: types.CallbackQuery, bot: Bot, state: FSMConte
     await callback.message.delete()
 
     data = await state.get_data()
-    target_user = data["target_user"]
+    target_user = await User.get(data["target_user_id"])
     if target_user.role == Role.ADMIN:
         await callback.message.answer(f"Адмінів блокувати не можна! Зверніться до розробника.")
         await state.set_state(UsersMenu.show)
@@ -222,7 +278,7 @@ async def excuse_mortal(callback: types.CallbackQuery, state: FSMContext):
     await callback.message.delete()
 
     data = await state.get_data()
-    target_user = data["target_user"]
+    target_user = await User.get(data["target_user_id"])
     await target_user.unban()
 
     await callback.message.answer(f"Користувач uid={target_user.id} був розблокований!")
@@ -237,7 +293,7 @@ async def confirm_ban(message: types.Message, bot: Bot, state: FSMContext):
         return
 
     await message.answer(f"Заблокувати користувача {chat_to_str(user_chat)}?", reply_markup=confirmation_kb)
-    await state.update_data(target_user = await User.get(int(uid)))
+    await state.update_data(target_user_id=int(uid))
     await state.set_state(UsersMenu.confirm_ban)
 
 @menu_router.message(UsersMenu.input_unban)
@@ -249,7 +305,7 @@ async def confirm_unban(message: types.Message, bot: Bot, state: FSMContext):
         return
 
     await message.answer(f"Розблокувати користувача {chat_to_str(user_chat)}?", reply_markup=confirmation_kb)
-    await state.update_data(target_user = await User.get(int(uid)))
+    await state.update_data(target_user_id=int(uid))
     await state.set_state(UsersMenu.confirm_unban)
 
 @menu_router.callback_query(or_f(UsersMenu.confirm_ban, UsersMenu.confirm_unban), F.data == "back")
@@ -274,4 +330,77 @@ async def back_to_admin_menu(message: types.Message, state: FSMContext):
 @menu_router.message(F.text.lower() == "користувачі")
 async def show_users_menu(message: types.Message, bot: Bot, state: FSMContext):
     await state.set_state(UsersMenu.show)
-    await message.answer(f"Меню користувачів", reply_markup=admin_users_menu)
\ No newline at end of file
+    await message.answer(f"Меню користувачів", reply_markup=admin_users_menu)
+
+
+# ======== TIMELINE ========
+def _counts_to_str(counts: dict[str, int]) -> str:
+    return ", ".join(f"{ReminderType.to_ukr(REMINDER_TYPES[type])} {count}" for type, count in sorted(counts.items()))
+
+async def render_timeline(days: int) -> str:
+    # served from the in-memory per-hour counts (bot.timeline), no scan of the reminders
+    now = time()
+    hours = await reminder_timeline.hours(now, now + days * 24 * 60 * 60)
+
+    by_day: dict[str, dict[str, int]] = {}
+    for hour, counts in hours:
+        day = by_day.setdefault(ts_to_dt(hour).strftime('%d-%m-%Y'), {})
+        for type, count in counts.items():
+            day[type] = day.get(type, 0) + count
+
+    total_count = sum(sum(counts.values()) for counts in by_day.values())
+    text = f"📅 Нагадування на найближчі {days} дн.: {total_count} \n\n"
+    for day, counts in by_day.items():
+        text += f"<b>{day}</b> – {sum(counts.values())} ({_counts_to_str(counts)})\n"
+
+    peaks = [(hour, counts) for hour, counts in hours if sum(counts.values()) >= Config.TIMELINE_PEAK_HOUR]
+    if peaks:
+        text += "\n⚠️ <b>Пікові години:</b>\n"
+        for hour, counts in sorted(peaks, key=lambda peak: sum(peak[1].values()), reverse=True)[:5]:
+            text += f"{ts_to_strdt(hour)} – {sum(counts.values())} ({_counts_to_str(counts)})\n"
+    return text
+
+@menu_router.message(F.text.lower() == "розклад")
+@menu_router.message(Command("due"))
+async def show_timeline(message: types.Message, command: CommandObject = None):
+    # /due 30 for the next 30 days, a month at most to fit in one message
+    days = Config.TIMELINE_DAYS
+    if command and command.args and command.args.isdigit():
+        days = min(max(int(command.args), 1), 31)
+    await message.answer(await render_timeline(days))
+
+
+# ======== BROADCAST ========
+@menu_router.message(Command("broadcast"))
+async def input_broadcast_text(message: types.Message, state: FSMContext):
+    await state.set_state(BroadcastMenu.input_text)
+    await message.answer("Введіть повідомлення для всіх власників команд:", reply_markup=cancel_kb)
+
+@menu_router.callback_query(BroadcastMenu.confirm, F.data == "confirm")
+async def run_broadcast(callback: types.CallbackQuery, bot: Bot, state: FSMContext):
+    data = await state.get_data()
+    await state.set_state(None)
+
+    # the confirmation message becomes the progress message, edited as the broadcast goes
+    await callback.message.edit_text("📣 Розсилка починається...")
+    broadcast = await Broadcast.create(
+        data["broadcast_text"],
+        admin_id=callback.from_user.id,
+        message_id=callback.message.message_id,
+        total=await Team.get_count()
+    )
+    start_broadcast(bot, broadcast)
+
+@menu_router.callback_query(BroadcastMenu.confirm, F.data == "back")
+@menu_router.callback_query(BroadcastMenu.input_text, F.data == "cancel")
+async def cancel_broadcast_input(callback: types.CallbackQuery, state: FSMContext):
+    await callback.message.delete()
+    await state.set_state(None)
+
+@menu_router.callback_query(F.data.startswith("broadcast:cancel:"))
+async def stop_broadcast(callback: types.CallbackQuery):
+    # the broadcast stops at its next checkpoint, whichever worker sends it
+    if await Broadcast.cancel(callback.data.split(":")[-1]):
+        await callback.answer("Розсилку буде зупинено")
+    else:
+        await callback.answer("⚠️ Розсилка вже завершена!")
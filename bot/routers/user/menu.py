@@ -8,6 +8,7 @@ from bot.keyboards.common import confirmation_kb, cancel_kb
 from bot.utils import ts_to_strdt, chat_to_str, delete_team, notify_admins
 from bot.models import User, Team
 from bot.models.enums import ReminderType
+from bot.exceptions import TeamAlreadyExistsException
 
 
 menu_router = Router(name=__name__)
@@ -39,17 +40,17 @@ async def process_team_name(message: types.Message, state: FSMContext, bot: Bot,
     if len(team_name) > Config.MAX_TEAM_NAME_LENGTH:
         await message.answer("Вибач, але назва команди занадто довга :(\n\nСпробуй ще раз:")
         return
-    existing_team = await Team.get(name=team_name)
-    if existing_team:
+
+    old_team_name = team.name
+    try:
+        await team.change_name(team_name)
+    except TeamAlreadyExistsException:
         await message.answer(f"Вибач, але команда з назвою <b>{team_name}</b> вже існує :(\n\nСпробуй іншу назву або звернися до адмінів.")
         return
-    
-    old_team_name = team.name
-    await team.change_name(team_name)
 
     await state.set_state(None)
     await message.answer(f"Назву команди успішно змінено на <b>{team_name}</b>!", reply_markup=user_menu)
-    await notify_admins(bot, f"🔄 Команда <b>{old_team_name}</b> (@{message.from_user.username}) змінила назву на <b>{team_name}</b>!")
+    await notify_admins(bot, f"🔄 Команда <b>{old_team_name}</b> (@{message.from_user.username}) змінила назву на <b>{team_name}</b>!", wait=False)
 
 @menu_router.callback_query(TeamMenu.confirm_deletion, F.data == "back")
 @menu_router.callback_query(TeamMenu.team_name, F.data == "cancel")
@@ -77,7 +78,7 @@ async def open_team_menu(message: types.Message, state: FSMContext, team: Team):
 
 @menu_router.message(F.text.lower() == "нагадування")
 async def show_reminders(message: types.Message, user: User):
-    reminders = await user.get_reminders()
+    reminders = await user.get_reminders({"type": 1, "remind_at": 1})
 
     text = ""
     for r in reminders:
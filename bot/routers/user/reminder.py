@@ -1,6 +1,6 @@
 from aiogram import Bot, Router, types, F
 
-from bot.utils import ts_to_strdt, notify_admins
+from bot.utils import ts_to_strdt, notify_admins, get_chat
 from bot.keyboards.user import user_menu
 from bot.models import User, Team
 from bot.models.enums import ReminderType
@@ -20,7 +20,7 @@ async def reschedule_reminder(type: ReminderType, user_id: int):
             return None
 
 async def notify_admins_about_confirmation(choice: str, reminder_type: ReminderType, user: User, team: Team, bot: Bot):
-    user_chat = await bot.get_chat(user.id)
+    user_chat = await get_chat(bot, user.id)
     reminder_type_str = ReminderType.to_ukr(reminder_type)
 
     if choice == "yes":
@@ -29,13 +29,13 @@ async def notify_admins_about_confirmation(choice: str, reminder_type: ReminderT
     else:
         text = f"👎 Користувач @{user_chat.username} з команди <b>{team.name}</b> " \
                f"передумав робити <b>{reminder_type_str}</b> оновлення."
-    await notify_admins(bot, text)
+    await notify_admins(bot, text, wait=False)
 
 @reminder_router.callback_query(F.data == "enrem")
 async def enable_reminders(callback: types.CallbackQuery, user: User):
     await callback.message.delete_reply_markup()
 
-    if await user.get_reminders():
+    if await user.has_reminders():
         await callback.message.edit_text("⚠️ <b>У вас уже виставлені нагадування!</b> \n\nЯкщо це помилка – повідомте адмінам.")
         return
 
@@ -61,7 +61,8 @@ async def handle_agree_update(callback: types.CallbackQuery, bot: Bot, user: Use
 
     await notify_admins(
         bot,
-        f"🙋‍♀️ Користувач @{callback.from_user.username} з команди {team.name} вирішив робити <b>{ReminderType.to_ukr(reminder_type)}</b> оновлення. Чекаємо підтвердження."
+        f"🙋‍♀️ Користувач @{callback.from_user.username} з команди {team.name} вирішив робити <b>{ReminderType.to_ukr(reminder_type)}</b> оновлення. Чекаємо підтвердження.",
+        wait=False
     )
 
 @reminder_router.callback_query(F.data.startswith("update:no"))
@@ -75,7 +76,8 @@ async def handle_deny_update(callback: types.CallbackQuery, bot: Bot, user: User
 
     await notify_admins(
         bot,
-        f"🙅‍♀️ Користувач @{callback.from_user.username} з команди {team.name} не буде робити <b>{ReminderType.to_ukr(reminder_type)}</b> оновлення."
+        f"🙅‍♀️ Користувач @{callback.from_user.username} з команди {team.name} не буде робити <b>{ReminderType.to_ukr(reminder_type)}</b> оновлення.",
+        wait=False
     )
 
 @reminder_router.callback_query(F.data.startswith("confirmupd"))
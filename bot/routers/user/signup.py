@@ -4,7 +4,7 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 
 from bot.config import Config
-from bot.utils import notify_admins, chat_to_str
+from bot.utils import notify_admins, chat_to_str, get_chat
 from bot.keyboards.user import team_name_confirmation_kb, user_menu
 from bot.keyboards.admin import admin_menu
 from bot.keyboards.common import request_approval_kb
@@ -20,12 +20,12 @@ class Form(StatesGroup):
 
 
 async def send_approval_request_to_admins(bot: Bot, request: Request):
-    sender_chat = await bot.get_chat(request.sender)
+    sender_chat = await get_chat(bot, request.sender)
     text = f"❗️ <b>Новий запит на реєстрацію команди</b> \n\n" \
     f"Команда: {request.team_name}\n" \
     f"Користувач: {chat_to_str(sender_chat)}"
     reply_markup = request_approval_kb(str(request.id))
-    await notify_admins(bot, text, reply_markup)
+    await notify_admins(bot, text, reply_markup, wait=False)
     
 
 @signup_router.message(CommandStart())
@@ -37,7 +37,7 @@ async def start(message: types.Message, state: FSMContext, user: User):
             return
         
         team = await user.get_team()
-        requests = await user.find_requests()
+        requests = await user.find_requests(projection={"team_name": 1})
         if team:
             await message.answer(
                 f"Привіт ще раз! За тобою вже закріплена команда <b>{team.name}</b>. "
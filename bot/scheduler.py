@@ -1,12 +1,43 @@
+from apscheduler.job import Job
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.jobstores.mongodb import MongoDBJobStore
 from apscheduler_di import ContextSchedulerDecorator
 
 from bot.config import Config
+from bot.jobstore import AsyncMongoDBJobStore
+from bot.metrics import Gauge
 
 
+def _upgrade_legacy_job(job: Job) -> bool:
+    # reminder jobs stored before they stopped persisting the message: kwargs {user_id, reminder_id, text, reply_markup}
+    # -> {user_id, reminder_id, type}, or they would fail when they fire (migrate_jobs.py does the same offline)
+    if "text" not in job.kwargs or "reminder_id" not in job.kwargs:
+        return False
+    job.kwargs = {
+        "user_id": job.kwargs["user_id"],
+        "reminder_id": job.kwargs["reminder_id"],
+        "type": job.kwargs["reminder_id"].split("-")[0]  # reminder ids are "{ReminderType.name}-{user_id}-{ts}"
+    }
+    return True
+
+
+jobstore = AsyncMongoDBJobStore(host=Config.DB_HOST, upgrade_job=_upgrade_legacy_job)
+
 scheduler = ContextSchedulerDecorator(
     AsyncIOScheduler(
-        jobstores={"default": MongoDBJobStore(host=Config.DB_HOST)}
+        jobstores={"default": jobstore}
     )
-)
\ No newline at end of file
+)
+
+
+async def get_job(job_id: str) -> Job | None:
+    # scheduler.get_job, but also finds a stored job that isn't loaded yet during the background loading
+    await jobstore.load_job(job_id)
+    return scheduler.get_job(job_id)
+
+def remove_jobs(job_ids: list[str]):
+    # many jobs at once, with a single db write (stored jobs that aren't loaded yet included)
+    jobstore.remove_jobs(job_ids)
+
+
+# jobs live in memory (see AsyncMongoDBJobStore), so this doesn't touch the db
+Gauge("bot_scheduler_jobs", "Pending scheduler jobs", lambda: len(jobstore))
\ No newline at end of file
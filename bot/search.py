@@ -0,0 +1,98 @@
+from bisect import bisect_left, insort
+
+from bot.db import db
+
+
+# Ukrainian transliteration (KMU 2010, without the word-start special cases) + a few russian letters,
+# so "цукіко", "Tsukiko" and "tsuk" all find the same team
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e", "є": "ie", "ж": "zh",
+    "з": "z", "и": "y", "і": "i", "ї": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n",
+    "о": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ь": "", "ю": "iu", "я": "ia", "'": "", "’": "", "ʼ": "",
+    "ё": "e", "ы": "y", "э": "e", "ъ": ""
+})
+
+NGRAM = 3
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().translate(_TRANSLIT).split())
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class TeamIndex:
+    """
+    In-memory team name index: a sorted list for prefix lookups (bisect) and a trigram index for substrings.
+    Built from the teams collection at startup, kept current by Team.create/change_name/delete.
+    """
+
+    def __init__(self):
+        self._names: dict[int, str] = {}  # team id -> normalized name
+        self._titles: dict[int, str] = {}  # team id -> name as is
+        self._sorted: list[tuple[str, int]] = []
+        self._ngrams: dict[str, set[int]] = {}
+
+    async def load(self):
+        self.__init__()
+        async for doc in db.teams.find({}, {"name": 1}):
+            self.add(doc["_id"], doc["name"])
+
+    def add(self, team_id: int, name: str):
+        self.remove(team_id)
+        key = normalize(name)
+        self._names[team_id] = key
+        self._titles[team_id] = name
+        insort(self._sorted, (key, team_id))
+        for gram in _ngrams(key):
+            self._ngrams.setdefault(gram, set()).add(team_id)
+
+    def remove(self, team_id: int):
+        key = self._names.pop(team_id, None)
+        if key is None:
+            return
+        del self._titles[team_id]
+        del self._sorted[bisect_left(self._sorted, (key, team_id))]
+        for gram in _ngrams(key):
+            ids = self._ngrams[gram]
+            ids.discard(team_id)
+            if not ids:
+                del self._ngrams[gram]
+
+    def search(self, query: str, limit: int) -> list[int]:
+        # prefix matches first, then the rest of substring matches (from NGRAM characters on), both in name order
+        q = normalize(query)
+        if not q:
+            return []
+
+        found = []
+        i = bisect_left(self._sorted, (q,))
+        while i < len(self._sorted) and len(found) < limit and self._sorted[i][0].startswith(q):
+            found.append(self._sorted[i][1])
+            i += 1
+        # a query shorter than a trigram has no index for substrings, and scanning every name on each keystroke
+        # of an inline query isn't worth it, so it gets prefix matches only
+        if len(found) == limit or len(q) < NGRAM:
+            return found
+
+        gram_sets = sorted((self._ngrams.get(gram, set()) for gram in _ngrams(q)), key=len)
+        candidates = set.intersection(*gram_sets)
+
+        prefixed = set(found)
+        for team_id in sorted(candidates, key=self._names.__getitem__):
+            if len(found) == limit:
+                break
+            if team_id not in prefixed and q in self._names[team_id]:
+                found.append(team_id)
+        return found
+
+    def name(self, team_id: int) -> str:
+        return self._titles[team_id]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+team_index = TeamIndex()
@@ -0,0 +1,173 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from heapq import heappush, heappop
+from enum import IntEnum
+from itertools import count
+from time import monotonic, perf_counter
+import asyncio
+
+from bot.config import Config
+from bot.metrics import Gauge, Histogram
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # replies to the user's own updates
+    NOTIFY = 1  # admin notifications
+    BULK = 2  # reminders
+
+
+# priority of the sends made in the current task, see send_priority()
+_priority: ContextVar[Priority] = ContextVar("send_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def send_priority(priority: Priority):
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+class TokenBucket:
+
+    __slots__ = ("_rate", "_capacity", "_tokens", "_updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = monotonic()
+
+    def _refill(self):
+        now = monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def take(self) -> float:
+        # takes a token, now or in the future, and returns the wait for it
+        self._refill()
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self._rate
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def give_back(self):
+        # returns a taken token that wasn't used
+        self._refill()
+        self._tokens = min(self._capacity, self._tokens + 1)
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self._tokens >= self._capacity
+
+
+class RateLane:
+    """
+    A token bucket with a priority queue in front: when sends have to wait, each token
+    goes to the most urgent waiter at the moment it becomes available.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self._bucket = TokenBucket(rate, capacity)
+        self._waiters: list[tuple[Priority, int, asyncio.Future]] = []
+        self._order = count()  # FIFO within a priority
+        self._paused_until = 0.0
+        self._granter: asyncio.Task = None
+
+    async def acquire(self, priority: Priority):
+        if not self._waiters and self._paused_until <= monotonic() and self._bucket.try_take():
+            return
+
+        slot = asyncio.get_running_loop().create_future()
+        heappush(self._waiters, (priority, next(self._order), slot))
+        if self._granter is None:
+            self._granter = asyncio.create_task(self._grant())
+        try:
+            await slot
+        except asyncio.CancelledError:
+            if slot.done() and not slot.cancelled():
+                # cancelled right after its token was granted, the next waiter can use it
+                self._bucket.give_back()
+            raise
+
+    async def _grant(self):
+        try:
+            while self._waiters:
+                delay = max(self._paused_until - monotonic(), self._bucket.take())
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # picked after the wait, so a reply queued meanwhile still goes before older reminders
+                while self._waiters:
+                    _, _, slot = heappop(self._waiters)
+                    if not slot.done():  # done = the waiter was cancelled
+                        slot.set_result(None)
+                        break
+                else:
+                    # all the waiters left were cancelled, the token goes unused
+                    self._bucket.give_back()
+        finally:
+            self._granter = None
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, monotonic() + seconds)
+
+    @property
+    def idle(self) -> bool:
+        return not self._waiters and self._bucket.full
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+
+class SendQueue:
+    """
+    Paces outgoing messages to Telegram's limits: a lane per chat (1 msg/s in private chats, 20/min in groups),
+    then the global lane (~30 msg/s). Interactive replies overtake queued notifications and reminders in both.
+    A RetryAfter pauses the global lane (see pause), since Telegram's flood control is per bot.
+    """
+
+    def __init__(self):
+        self._global = RateLane(Config.SEND_GLOBAL_RATE, Config.SEND_GLOBAL_RATE)
+        self._chats: dict[int | str, RateLane] = {}
+
+    def _chat_lane(self, chat_id: int | str) -> RateLane:
+        lane = self._chats.get(chat_id)
+        if lane is None:
+            if len(self._chats) >= Config.CACHE_MAX_SIZE:
+                # an idle lane is a full bucket, a new one for the same chat behaves the same
+                self._chats = {chat: chat_lane for chat, chat_lane in self._chats.items() if not chat_lane.idle}
+            if isinstance(chat_id, str) or chat_id < 0:  # @channel usernames and group ids
+                lane = RateLane(Config.SEND_GROUP_RATE, Config.SEND_CHAT_BURST)
+            else:
+                lane = RateLane(Config.SEND_CHAT_RATE, Config.SEND_CHAT_BURST)
+            self._chats[chat_id] = lane
+        return lane
+
+    async def acquire(self, chat_id: int | str | None, priority: Priority):
+        start = perf_counter()
+        if chat_id is not None:
+            await self._chat_lane(chat_id).acquire(priority)
+        await self._global.acquire(priority)
+        send_wait_seconds.observe(perf_counter() - start, priority.name)
+
+    def pause(self, seconds: float):
+        self._global.pause(seconds)
+
+    def __len__(self) -> int:
+        return len(self._global) + sum(len(lane) for lane in self._chats.values())
+
+
+send_queue = SendQueue()
+
+send_wait_seconds = Histogram("bot_send_queue_wait_seconds", "Time a message waited for its rate limit slot", ("priority",))
+Gauge("bot_send_queue_length", "Messages waiting for a rate limit slot", lambda: len(send_queue))
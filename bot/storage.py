@@ -0,0 +1,48 @@
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorCollection
+from typing import Any, Dict, Optional
+
+
+class MongoStorage(BaseStorage):
+    """
+    FSM storage in a MongoDB collection, so states survive restarts and are shared between bot processes.
+    Data is stored as plain BSON, so handlers keep ids there, not model objects.
+    Abandoned states are removed by the TTL index on `updated_at` (see bot.db.INDEXES).
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self._collection = collection
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ''}:{key.destiny}"
+
+    async def _set(self, key: StorageKey, field: str, value: Any):
+        update = {"$set": {"updated_at": datetime.utcnow()}}
+        if value:
+            update["$set"][field] = value
+        else:
+            update["$unset"] = {field: ""}
+        await self._collection.update_one({"_id": self._key(key)}, update, upsert=True)
+
+    async def _get(self, key: StorageKey, field: str) -> Any:
+        doc = await self._collection.find_one({"_id": self._key(key)}, {field: 1})
+        return doc.get(field) if doc else None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._set(key, "state", state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._get(key, "state")
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await self._set(key, "data", data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return await self._get(key, "data") or {}
+
+    async def close(self) -> None:
+        # the motor client is shared with the models and lives as long as the process
+        pass
@@ -0,0 +1,76 @@
+from aiogram import Bot, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import FormData
+
+from bot.models.enums import ReminderType
+from bot.keyboards import is_static
+from bot.keyboards.user import update_reminder_kb, confirm_update_reminder_kb
+
+
+# reminder messages are rendered when the job fires, so persisted jobs only keep (user_id, reminder_id, type)
+_UPDATE_TEXT = "🌱 <b>{title} оновлення</b>\n\n" \
+    "Привіт, пора оновити пост команди на каналі @UA_manga :) \nПисати адмінці в особисті. \n" \
+    "Деталі про написання можна знайти тут: https://t.me/UA_manga_extra/30  \n\n" \
+    "Обов'язково натисни одну з кнопок, щоб повідомити мене про своє рішення та поставити нове нагадування 👇"
+
+_FULL_UPDATE_TEXT = "🌱 <b>{title} оновлення</b>\n\n" \
+    "Привіт, пора повністю оновити пост твоєї команди на каналі @UA_manga :) \nПисати адмінці в особисті. \n" \
+    "Деталі про написання можна знайти тут: https://t.me/UA_manga_extra/30  \n\n" \
+    "Обов'язково натисни одну з кнопок, щоб повідомити мене про своє рішення та поставити нове нагадування 👇"
+
+_CONFIRM_TEXT = "❗️ <b>{title} оновлення</b>\n\n" \
+    "Привіт, ви вже надіслали новий пост адмінці?\n\n" \
+    "Обов'язково натисни одну з кнопок, щоб повідомити мене про своє рішення та поставити нове нагадування 👇"
+
+REMINDER_TEXTS = {
+    ReminderType.MINOR: _UPDATE_TEXT,
+    ReminderType.MAJOR: _FULL_UPDATE_TEXT,
+    ReminderType.CONFIRM_MINOR: _CONFIRM_TEXT,
+    ReminderType.CONFIRM_MAJOR: _CONFIRM_TEXT
+}
+
+
+def _build_reminder(type: ReminderType) -> tuple[str, types.InlineKeyboardMarkup]:
+    text = REMINDER_TEXTS[type].format(title=ReminderType.to_ukr(type).upper())
+    match type:
+        case ReminderType.MINOR | ReminderType.MAJOR:
+            reply_markup = update_reminder_kb(reminder_type=type)
+        case _:
+            reply_markup = confirm_update_reminder_kb(confirmation_type=type)
+    return text, reply_markup
+
+# the messages don't depend on the receiver, so they are built once
+_REMINDERS = {type: _build_reminder(type) for type in ReminderType}
+
+
+def render_reminder(type: ReminderType) -> tuple[str, types.InlineKeyboardMarkup]:
+    return _REMINDERS[type]
+
+
+class TemplateSession(AiohttpSession):
+    """AiohttpSession that serializes every static keyboard (see bot.keyboards.static) once, not on every request."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._markup_json: dict[int, str] = {}
+
+    def build_form_data(self, bot: Bot, method: TelegramMethod[TelegramType]) -> FormData:
+        markup = getattr(method, "reply_markup", None)
+        if markup is None or not is_static(markup):
+            return super().build_form_data(bot, method)
+
+        markup_json = self._markup_json.get(id(markup))
+        if markup_json is None:
+            files = {}
+            markup_json = self.prepare_value(markup.model_dump(warnings=False), bot=bot, files=files)
+            if files:
+                # not expected in a keyboard, but then it can't be sent as cached JSON
+                return super().build_form_data(bot, method)
+            self._markup_json[id(markup)] = markup_json
+
+        # everything else (files included) as usual, without the markup, which is added already serialized
+        form = super().build_form_data(bot, method.model_copy(update={"reply_markup": None}))
+        form.add_field("reply_markup", markup_json)
+        return form
@@ -0,0 +1,102 @@
+from time import monotonic, time
+import asyncio
+
+from bot.config import Config
+from bot.db import db
+
+
+HOUR = 60 * 60
+
+
+def hour_of(ts: float) -> int:
+    return int(ts - ts % HOUR)
+
+
+class ReminderTimeline:
+    """
+    Pending reminders counted per hour and type, for the admins' "due soon" view.
+    Built with one aggregation over reminders.remind_at on first use, then kept current by Reminder.create/reschedule/
+    delete/pop without touching the db. Rebuilt every TIMELINE_TTL, which also corrects drift from changes
+    made by other workers of a cluster. Types are kept as their db values (bot.models imports this module).
+    """
+
+    def __init__(self):
+        self._hours: dict[int, dict[str, int]] = {}  # hour start timestamp -> reminder type -> count
+        self._loaded_at: float = None  # monotonic
+        self._changes: list[tuple[float, str, int]] = None  # (remind_at, type, +1/-1) made while a load is running
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and monotonic() - self._loaded_at < Config.TIMELINE_TTL
+
+    async def load(self):
+        pipeline = [
+            {"$match": {"remind_at": {"$gte": hour_of(time())}}},
+            {"$group": {
+                "_id": {"hour": {"$subtract": ["$remind_at", {"$mod": ["$remind_at", HOUR]}]}, "type": "$type"},
+                "count": {"$sum": 1}
+            }}
+        ]
+        hours = {}
+        # changes made while the aggregation runs are replayed on its result, not lost with the replaced counts.
+        # One made right before the aggregation reads that reminder is counted twice until the next load
+        self._changes = []
+        try:
+            async for doc in db.reminders.aggregate(pipeline):
+                hours.setdefault(int(doc["_id"]["hour"]), {})[doc["_id"]["type"]] = doc["count"]
+            for remind_at, type, delta in self._changes:
+                self._apply(hours, remind_at, type, delta)
+        finally:
+            self._changes = None
+        self._hours = hours
+        self._loaded_at = monotonic()
+
+    async def ensure_loaded(self):
+        if not self._fresh():
+            async with self._lock:
+                if not self._fresh():
+                    await self.load()
+
+    @staticmethod
+    def _apply(hours: dict[int, dict[str, int]], remind_at: float, type: str, delta: int):
+        hour = hour_of(remind_at)
+        if delta > 0:
+            counts = hours.setdefault(hour, {})
+            counts[type] = counts.get(type, 0) + delta
+            return
+        counts = hours.get(hour)
+        if counts and counts.get(type):
+            counts[type] -= 1
+            if not counts[type]:
+                del counts[type]
+            if not counts:
+                del hours[hour]
+
+    def _change(self, remind_at: float, type: str, delta: int):
+        if self._changes is not None:
+            self._changes.append((remind_at, type, delta))
+        # before the first load there is nothing to update, the load counts it
+        if self._loaded_at is not None:
+            self._apply(self._hours, remind_at, type, delta)
+
+    def add(self, remind_at: float, type: str):
+        self._change(remind_at, type, 1)
+
+    def remove(self, remind_at: float, type: str):
+        self._change(remind_at, type, -1)
+
+    def move(self, old_remind_at: float, new_remind_at: float, type: str):
+        self.remove(old_remind_at, type)
+        self.add(new_remind_at, type)
+
+    async def hours(self, start: float, end: float) -> list[tuple[int, dict[str, int]]]:
+        # (hour start, counts by type) for the hours in [start, end) that have reminders, in time order
+        await self.ensure_loaded()
+        first, now = hour_of(start), hour_of(time())
+        # past hours are only left until the next load, drop them on the way
+        for hour in [hour for hour in self._hours if hour < now]:
+            del self._hours[hour]
+        return sorted((hour, dict(counts)) for hour, counts in self._hours.items() if first <= hour < end)
+
+
+reminder_timeline = ReminderTimeline()
@@ -1,9 +1,24 @@
 from aiogram import Bot, types
 from datetime import datetime
+from typing import Coroutine
+import asyncio
 
+from bot.cache import chats_cache, MISSING
+from bot.config import Config
 from bot.models import User, Team
+from bot.scheduler import remove_jobs
+from bot.sender import send_priority, Priority
 
 
+_background_tasks = set()  # strong refs to detached tasks, otherwise they can be garbage collected midway
+
+
+def spawn_background(coro: Coroutine) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
 def ts_to_dt(ts: float) -> datetime:
     return datetime.fromtimestamp(ts)
 
@@ -13,16 +28,36 @@ def ts_to_strdt(ts: float) -> str:
 def chat_to_str(chat: types.Chat) -> str:
     return f"@{chat.username} [uid=<code>{chat.id}</code>]"
 
-async def notify_admins(bot: Bot, text: str, reply_markup: types.InlineKeyboardMarkup = None):
-    for admin in await User.find_admins():
-        try:
-            await bot.send_message(
-                chat_id=admin.id,
-                text=text,
-                reply_markup=reply_markup
-            )
-        except Exception:
-            continue
+async def get_chat(bot: Bot, chat_id: int) -> types.Chat | types.User:
+    # private chat id = user id, so GlobalMiddleware fills the cache with event.from_user for free
+    chat = chats_cache.get(chat_id)
+    if chat is MISSING:
+        chat = await bot.get_chat(chat_id)
+        chats_cache.set(chat_id, chat)
+    return chat
+
+async def _notify_admin(bot: Bot, admin_id: int, text: str, reply_markup: types.InlineKeyboardMarkup = None):
+    try:
+        await bot.send_message(
+            chat_id=admin_id,
+            text=text,
+            reply_markup=reply_markup
+        )
+    except Exception:
+        return
+
+async def _notify_admins(bot: Bot, text: str, reply_markup: types.InlineKeyboardMarkup = None):
+    # rate limits and RetryAfter are handled by the send queue (bot.sender), behind the user's own replies
+    admin_ids = await User.find_admin_ids()
+    with send_priority(Priority.NOTIFY):
+        await asyncio.gather(*(_notify_admin(bot, admin_id, text, reply_markup) for admin_id in admin_ids))
+
+async def notify_admins(bot: Bot, text: str, reply_markup: types.InlineKeyboardMarkup = None, wait: bool = True):
+    # wait=False sends in the background, so the handler can answer the user without waiting for the admins
+    if wait:
+        await _notify_admins(bot, text, reply_markup)
+    else:
+        spawn_background(_notify_admins(bot, text, reply_markup))
 
 async def notify_user(bot: Bot, chat_id: int, text: str):
     try:
@@ -31,10 +66,21 @@ async def notify_user(bot: Bot, chat_id: int, text: str):
         return
 
 async def delete_team(id: int, bot: Bot, reason: str = ""):
-    user = await User.get(id)
-    for reminder in await user.get_reminders():
-        await reminder.delete(with_job=True)
-
+    # safe to call again or for an already deleted team, admins are notified only if there was a team
     team = await Team.get(id)
-    await team.delete()
-    await notify_admins(bot, f"🫡 Команду <b>{team.name}</b> було видалено: {reason}")
+    # in memory, the job store persists it in the background
+    remove_jobs(await Team.delete_cascade(id))
+
+    if team:
+        await notify_admins(bot, f"🫡 Команду <b>{team.name}</b> було видалено: {reason}")
+
+async def delete_teams(ids: list[int], bot: Bot, reason: str = ""):
+    # delete_team for many teams at once: one cascade and one notification
+    names = [team.name async for team in Team.stream({"_id": {"$in": ids}}, {"name": 1})]
+    remove_jobs(await Team.delete_cascade_many(ids))
+
+    if names:
+        shown = ", ".join(f"<b>{name}</b>" for name in names[:Config.ITEMS_PER_PAGE])
+        if len(names) > Config.ITEMS_PER_PAGE:
+            shown += f" та ще {len(names) - Config.ITEMS_PER_PAGE}"
+        await notify_admins(bot, f"🫡 Було видалено команд: {len(names)} ({reason}) \n\n{shown}")
\ No newline at end of file
@@ -0,0 +1,62 @@
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+import asyncio
+import signal
+
+from bot.config import Config
+from bot.metrics import setup_metrics_route
+
+
+class DrainingRequestHandler(SimpleRequestHandler):
+    """Handles updates in background tasks like SimpleRequestHandler, but waits for them on shutdown."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tasks = set()
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+        task = asyncio.create_task(self._background_feed_update(bot=bot, update=update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def close(self):
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=Config.SHUTDOWN_TIMEOUT)
+        await super().close()
+
+
+async def _wait_for_stop_signal():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher):
+    app = web.Application()
+    # registered before setup_application, so in-flight updates are drained before the dispatcher shutdown hooks run
+    DrainingRequestHandler(dispatcher=dp, bot=bot, secret_token=Config.WEBHOOK_SECRET).register(app, path=Config.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    setup_metrics_route(app)
+
+    if Config.WEBHOOK_URL:
+        await bot.set_webhook(
+            Config.WEBHOOK_URL + Config.WEBHOOK_PATH,
+            secret_token=Config.WEBHOOK_SECRET,
+            max_connections=Config.WEBHOOK_MAX_CONNECTIONS
+        )
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    # in a cluster all workers on a host listen on the same port, the kernel balances connections between them
+    await web.TCPSite(runner, Config.WEBAPP_HOST, Config.WEBAPP_PORT, reuse_port=Config.CLUSTER or None).start()
+    print(f'WEBHOOK LISTENING: {Config.WEBAPP_HOST}:{Config.WEBAPP_PORT}{Config.WEBHOOK_PATH}')
+
+    try:
+        await _wait_for_stop_signal()
+    finally:
+        await runner.cleanup()
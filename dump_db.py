@@ -1,20 +1,71 @@
+import gzip
+import os
+
 from pymongo import MongoClient
 from bson import json_util
 
 
-def dump(fp: str, uri: str, db_names: list):
+# Streams every collection to <out_dir>/<db>/<collection>.ndjson[.gz], one extended JSON document per line,
+# in constant memory. Progress is checkpointed every batch, so an interrupted dump continues where it stopped.
+# Compressed files are written as one gzip member per batch (gzip readers read concatenated members as one
+# stream), so they can be cut at a checkpoint just like plain ones.
+
+BATCH_SIZE = 1000
+DUMP_CHECKPOINT_SUFFIX = '.dump-checkpoint'  # not '.checkpoint', that's the restore's (populate_db.py)
+
+
+def _write_batch(file, lines: list, compress: bool):
+    data = ''.join(lines).encode('utf-8')
+    file.write(gzip.compress(data) if compress else data)
+    file.flush()
+
+
+def dump_collection(collection, fp: str, compress: bool = False, batch_size: int = BATCH_SIZE):
+    checkpoint_fp = fp + DUMP_CHECKPOINT_SUFFIX
+    checkpoint = {'last_id': None, 'count': 0, 'offset': 0}
+    if os.path.exists(checkpoint_fp) and os.path.exists(fp):
+        with open(checkpoint_fp) as file:
+            checkpoint = json_util.loads(file.read())
+
+    query = {}
+    if checkpoint['count']:
+        query = {'_id': {'$gt': checkpoint['last_id']}}
+        print(f'{collection.full_name}: resuming after {checkpoint["count"]} documents')
+
+    with open(fp, 'r+b' if checkpoint['count'] else 'wb') as file:
+        if checkpoint['count']:
+            # drop whatever was written after the last checkpoint (a partial gzip member too)
+            file.seek(checkpoint['offset'])
+            file.truncate()
+
+        count = checkpoint['count']
+        batch = []
+        for doc in collection.find(query, sort=[('_id', 1)], batch_size=batch_size):
+            batch.append(json_util.dumps(doc) + '\n')
+            count += 1
+            if len(batch) == batch_size:
+                _write_batch(file, batch, compress)
+                batch = []
+                with open(checkpoint_fp, 'w') as cp_file:
+                    cp_file.write(json_util.dumps({'last_id': doc['_id'], 'count': count, 'offset': file.tell()}))
+                print(f'{collection.full_name}: {count}')
+        if batch:
+            _write_batch(file, batch, compress)
+
+    if os.path.exists(checkpoint_fp):
+        os.remove(checkpoint_fp)
+    print(f'{collection.full_name}: done, {count} documents')
+
+
+def dump(out_dir: str, uri: str, db_names: list, compress: bool = True, batch_size: int = BATCH_SIZE):
     client = MongoClient(uri)
-    data = {}
 
     for db_name in db_names:
-        data[db_name] = {}
-        col_names = client[db_name].list_collection_names()
-        for col_name in col_names:
-            data[db_name][col_name] = list(client[db_name][col_name].find({}))
-
-    with open(fp, 'w') as file:
-        file.write(json_util.dumps(data, indent=2))
+        os.makedirs(os.path.join(out_dir, db_name), exist_ok=True)
+        for col_name in client[db_name].list_collection_names():
+            fp = os.path.join(out_dir, db_name, col_name + ('.ndjson.gz' if compress else '.ndjson'))
+            dump_collection(client[db_name][col_name], fp, compress, batch_size)
 
 
 if __name__ == '__main__':
-    dump('data.json', 'mongodb://localhost:27018', ['apscheduler', 'bot'])
\ No newline at end of file
+    dump('backup', 'mongodb://localhost:27018', ['apscheduler', 'bot'])
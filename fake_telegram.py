@@ -0,0 +1,74 @@
+import asyncio
+from collections import Counter
+from time import time
+
+from aiohttp import web
+
+
+# Minimal stand-in for the Bot API, for benchmarks: answers every method with a plausible result
+# and counts the calls. Point the bot at it with BOT_API_URL=http://127.0.0.1:8081
+
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "bot", "username": "bot"}
+
+
+class FakeTelegram:
+
+    def __init__(self):
+        self.calls = Counter()
+        self._message_id = 0
+        self._waiters: list[tuple[str, int, asyncio.Future]] = []
+
+    def _chat(self, chat_id) -> dict:
+        chat_id = int(chat_id)
+        return {"id": chat_id, "type": "private", "username": f"user{chat_id}", "first_name": "user"}
+
+    def _message(self, params: dict) -> dict:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time()),
+            "chat": self._chat(params.get("chat_id", 0)),
+            "from": BOT_USER,
+            "text": params.get("text", "")
+        }
+
+    def _result(self, method: str, params: dict):
+        match method:
+            case "getme":
+                return BOT_USER
+            case "getchat":
+                return self._chat(params["chat_id"])
+            case "sendmessage" | "editmessagetext" | "editmessagereplymarkup":
+                return self._message(params)
+            case _:
+                return True
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        params = dict(await request.post())
+        self.calls[method] += 1
+        for waiter in self._waiters:
+            if waiter[0] == method and self.calls[method] >= waiter[1] and not waiter[2].done():
+                waiter[2].set_result(None)
+        return web.json_response({"ok": True, "result": self._result(method, params)})
+
+    async def wait_for(self, method: str, count: int):
+        if self.calls[method.lower()] >= count:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((method.lower(), count, future))
+        await future
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+
+async def start(host: str = "127.0.0.1", port: int = 8081) -> tuple[FakeTelegram, web.AppRunner]:
+    fake = FakeTelegram()
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return fake, runner
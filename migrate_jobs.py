@@ -0,0 +1,38 @@
+import pickle
+
+from bson.binary import Binary
+from pymongo import MongoClient
+
+
+# One-shot migration of reminder jobs created before jobs stopped persisting the message:
+# kwargs {user_id, reminder_id, text, reply_markup} -> {user_id, reminder_id, type}.
+# Run it while the bot is stopped, the running scheduler keeps its own copy of the jobs. The bot also upgrades
+# such jobs itself as it loads them (bot.scheduler), this is for doing it ahead of a deploy.
+
+
+def migrate(uri: str, db_name: str = 'apscheduler', col_name: str = 'jobs'):
+    collection = MongoClient(uri)[db_name][col_name]
+    migrated = 0
+
+    for doc in collection.find({}, ['job_state']):
+        state = pickle.loads(doc['job_state'])
+        kwargs = state['kwargs']
+        if 'text' not in kwargs:
+            continue
+
+        state['kwargs'] = {
+            'user_id': kwargs['user_id'],
+            'reminder_id': kwargs['reminder_id'],
+            'type': kwargs['reminder_id'].split('-')[0]  # reminder ids are "{ReminderType.name}-{user_id}-{ts}"
+        }
+        collection.update_one(
+            {'_id': doc['_id']},
+            {'$set': {'job_state': Binary(pickle.dumps(state, pickle.HIGHEST_PROTOCOL))}}
+        )
+        migrated += 1
+
+    print('MIGRATED JOBS:', migrated)
+
+
+if __name__ == '__main__':
+    migrate('mongodb://localhost:27018')
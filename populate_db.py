@@ -1,20 +1,84 @@
-from pymongo import MongoClient, errors
+import gzip
+import os
+
+from pymongo import MongoClient, ReplaceOne, errors
 from bson import json_util
 
+from dump_db import DUMP_CHECKPOINT_SUFFIX
+
+
+# Restores a dump made by dump_db.py (<src_dir>/<db>/<collection>.ndjson[.gz]) in batches with insert_many,
+# skipping documents that already exist (or replacing them with upsert=True). The number of restored lines
+# is checkpointed every batch, so an interrupted restore continues from the last batch. Collections whose
+# dump was interrupted are skipped.
+
+BATCH_SIZE = 1000
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _open(fp: str):
+    if fp.endswith('.gz'):
+        return gzip.open(fp, 'rt', encoding='utf-8')
+    return open(fp, encoding='utf-8')
+
+
+def _write_batch(collection, batch: list, upsert: bool):
+    if upsert:
+        collection.bulk_write([ReplaceOne({'_id': doc['_id']}, doc, upsert=True) for doc in batch], ordered=False)
+        return
+
+    try:
+        collection.insert_many(batch, ordered=False)
+    except errors.BulkWriteError as e:
+        if any(error['code'] != DUPLICATE_KEY_ERROR for error in e.details['writeErrors']):
+            raise
+
+
+def populate_collection(collection, fp: str, upsert: bool = False, batch_size: int = BATCH_SIZE):
+    checkpoint_fp = fp + '.checkpoint'
+    done = 0
+    if os.path.exists(checkpoint_fp):
+        with open(checkpoint_fp) as file:
+            done = int(file.read())
+        print(f'{collection.full_name}: resuming after {done} documents')
+
+    count = 0
+    batch = []
+    with _open(fp) as file:
+        for line in file:
+            count += 1
+            if count <= done:
+                continue
+            batch.append(json_util.loads(line))
+            if len(batch) == batch_size:
+                _write_batch(collection, batch, upsert)
+                batch = []
+                with open(checkpoint_fp, 'w') as cp_file:
+                    cp_file.write(str(count))
+                print(f'{collection.full_name}: {count}')
+
+    if batch:
+        _write_batch(collection, batch, upsert)
+
+    if os.path.exists(checkpoint_fp):
+        os.remove(checkpoint_fp)
+    print(f'{collection.full_name}: done, {count} documents')
+
 
-def populate(src_fp: str, uri: str):
+def populate(src_dir: str, uri: str, upsert: bool = False, batch_size: int = BATCH_SIZE):
     client = MongoClient(uri)
-    with open(src_fp) as file:
-        data = json_util.loads(file.read())
 
-    for db_name, collections in data.items():
-        for col_name, entries in collections.items():
-            for e in entries:
-                try:
-                    client[db_name][col_name].insert_one(e)
-                except errors.DuplicateKeyError:
-                    continue
+    for db_name in sorted(os.listdir(src_dir)):
+        for file_name in sorted(os.listdir(os.path.join(src_dir, db_name))):
+            if not file_name.endswith(('.ndjson', '.ndjson.gz')):
+                continue
+            col_name = file_name.split('.ndjson')[0]
+            if os.path.exists(os.path.join(src_dir, db_name, file_name + DUMP_CHECKPOINT_SUFFIX)):
+                # the dump of this collection was interrupted, run dump_db.py again to finish it first
+                print(f'{db_name}.{col_name}: skipped, the dump is unfinished')
+                continue
+            populate_collection(client[db_name][col_name], os.path.join(src_dir, db_name, file_name), upsert, batch_size)
 
 
 if __name__ == '__main__':
-    populate('data.json', 'mongodb://localhost:27018')
\ No newline at end of file
+    populate('backup', 'mongodb://localhost:27018')
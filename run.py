@@ -1,14 +1,69 @@
 import asyncio
+import time
+
+
+async def report_jobs_loaded(jobstore):
+    start = time.perf_counter()
+    await jobstore.wait_loaded()
+    print(f'JOBS LOADED: {len(jobstore)} in {time.perf_counter() - start:.2f}s')
 
 
 async def run():
     from bot import bot, Bot, dp
-    from bot.scheduler import scheduler
+    from bot.config import Config
+    from bot.db import ensure_indexes
+    from bot.scheduler import scheduler, jobstore
+    from bot.jobs.dispatcher import setup_dispatcher
+    from bot.broadcast import setup_broadcasts
+    from bot.utils import spawn_background
+    from bot.search import team_index
     scheduler.ctx.add_instance(bot, Bot)    
 
-    scheduler.start()
-    print('JOBS LOADED:', len(scheduler.get_jobs()))
-    await dp.start_polling(bot)
+    all_indexes, _ = await asyncio.gather(ensure_indexes(), team_index.load())
+    for col_name, indexes in all_indexes.items():
+        print(f'INDEXES {col_name}:', indexes)
+    print('TEAMS INDEXED:', len(team_index))
+
+    if Config.CLUSTER:
+        if Config.BOT_MODE != "webhook" or Config.REMINDER_DISPATCH != "batch":
+            raise SystemExit("CLUSTER=1 needs BOT_MODE=webhook and REMINDER_DISPATCH=batch")
+        from bot.cluster import watch_invalidations, WORKER_ID
+        from bot.leader import run_scheduler_leader
+        print('WORKER:', WORKER_ID)
+
+        # the scheduler starts once this worker becomes the leader, which may be never
+        stop_leader = asyncio.Event()
+        leader = asyncio.create_task(run_scheduler_leader(stop_leader))
+        watcher = asyncio.create_task(watch_invalidations())
+
+        async def on_shutdown():
+            watcher.cancel()
+            stop_leader.set()  # stops the scheduler and releases the lease, another worker takes over right away
+            await leader
+            await asyncio.sleep(0)
+    else:
+        # jobs are loaded in the background, updates are served meanwhile
+        scheduler.start()
+        setup_dispatcher()
+        setup_broadcasts()
+        jobs_loaded = spawn_background(report_jobs_loaded(jobstore))
+
+        # runs after in-flight updates are done, flushes the job store
+        async def on_shutdown():
+            jobs_loaded.cancel()
+            scheduler.shutdown()
+            await asyncio.sleep(0)  # AsyncIOScheduler.shutdown is scheduled with call_soon_threadsafe
+    dp.shutdown.register(on_shutdown)
+
+    if Config.BOT_MODE == "webhook":
+        from bot.webhook import run_webhook
+        await run_webhook(bot, dp)
+    else:
+        if Config.METRICS_PORT:
+            from bot.metrics import start_metrics_server
+            await start_metrics_server()
+            print(f'METRICS LISTENING: {Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics')
+        await dp.start_polling(bot)
 
 
 if __name__ == "__main__":
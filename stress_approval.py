@@ -0,0 +1,109 @@
+import asyncio
+import os
+from collections import Counter
+from itertools import count
+from time import perf_counter
+
+import fake_telegram
+from bench_bot import callback_update, _use_mongomock
+
+
+# Concurrency check of the request approval flow (bot/routers/admin/approval.py): several admins confirm the same
+# request at the same moment, some approving and some declining, through dp.feed_raw_update like bench_bot.py.
+# Every request must end up decided exactly once: one team per approved request, none for declined ones, one
+# notification per user, no handler errors. Every twentieth request asks for the name of the one before it: that
+# one is approved first, then all admins approve the duplicate at once, so the taken name path (the request is put
+# back to pending, bot.models.Request.reopen_many) is hammered too and every duplicate must end up pending.
+
+ADMIN_ID_BASE = 1
+USER_ID_BASE = 10**9
+
+
+async def stress(requests: int = 100, admins: int = 5, parallel: int = 10, mongomock: bool = True):
+    os.environ.setdefault("BOT_TOKEN", "123456:bench")
+    os.environ.setdefault("DB_HOST", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "stress")
+    os.environ.setdefault("BOT_API_URL", "http://127.0.0.1:8081")
+    if mongomock:
+        _use_mongomock()
+
+    from bot import bot, dp
+    from bot.db import ensure_indexes, db
+    from bot.models import User, Request
+    from bot.models.enums import Role, RequestStatus
+    from bot.routers.admin.approval import Approval
+
+    fake, runner = await fake_telegram.start()
+    await ensure_indexes()
+
+    # a group of `admins` admins per request handled at once, an admin is in one FSM state at a time
+    for admin_id in range(ADMIN_ID_BASE, ADMIN_ID_BASE + admins * parallel):
+        await User.create(admin_id, Role.ADMIN, if_exists="return")
+    request_ids, duplicate_ids, approve_only = [], [], set()
+    for i in range(requests):
+        name = f"Stress team {i - 1}" if i % 20 == 1 else f"Stress team {i}"
+        request_id = str((await Request.create(USER_ID_BASE + i, name)).id)
+        if i % 20 == 1:
+            duplicate_ids.append(request_id)
+        else:
+            request_ids.append(request_id)
+        if i % 20 in (0, 1):
+            approve_only.add(request_id)
+
+    update_ids = count(1)
+    errors = []
+
+    async def confirm(admin_id: int, request_id: str, action: str):
+        state = dp.fsm.get_context(bot, chat_id=admin_id, user_id=admin_id)
+        await state.set_state(Approval.confirm)
+        await state.set_data({"request_id": request_id, "approval_action": action, "request_message_text": "Запит"})
+        try:
+            await dp.feed_raw_update(bot, callback_update(next(update_ids), admin_id, "confirm", "Зареєструвати команду?"))
+        except Exception as e:
+            errors.append(e)
+
+    async def hammer(group: int, request_id: str):
+        first_admin = ADMIN_ID_BASE + group * admins
+        await asyncio.gather(*(
+            confirm(admin_id, request_id, "decline" if admin_id % 3 == 2 and request_id not in approve_only else "approve")
+            for admin_id in range(first_admin, first_admin + admins)
+        ))
+
+    start = perf_counter()
+    # the duplicates go last, once the names they ask for are taken
+    for ids in (request_ids, duplicate_ids):
+        for i in range(0, len(ids), parallel):
+            await asyncio.gather(*(hammer(group, request_id) for group, request_id in enumerate(ids[i:i + parallel])))
+    elapsed = perf_counter() - start
+
+    statuses = Counter()
+    problems = []
+    async for doc in db.requests.find({}):
+        status = RequestStatus(doc["status"])
+        statuses[status] += 1
+        team = await db.teams.find_one({"_id": doc["sender"]})
+        if status == RequestStatus.APPROVED and not team:
+            problems.append(f"approved without a team: {doc['team_name']}")
+        if status != RequestStatus.APPROVED and team:
+            problems.append(f"{status.value} with a team: {doc['team_name']}")
+        if str(doc["_id"]) in duplicate_ids and status != RequestStatus.PENDING:
+            problems.append(f"duplicate name {status.value}: {doc['team_name']}")
+    teams = await db.teams.count_documents({})
+    # one approval/decline notification per decided request, sent by the admin who won
+    notifications = fake.calls["sendmessage"]
+    decided = statuses[RequestStatus.APPROVED] + statuses[RequestStatus.DECLINED]
+    if notifications != decided:
+        problems.append(f"{notifications} notifications for {decided} decided requests")
+    problems += [f"handler error: {e!r}" for e in errors[:5]]
+
+    await bot.session.close()
+    await runner.cleanup()
+
+    print(f'CONFIRMATIONS: {requests * admins} in {elapsed:.2f}s ({admins} admins at once per request)')
+    print('REQUESTS:', {status.value: n for status, n in statuses.items()}, 'TEAMS:', teams, 'NOTIFICATIONS:', notifications)
+    print('ERRORS:', len(errors))
+    print('OK' if not problems else 'FAILED:\n' + '\n'.join(problems))
+
+
+if __name__ == '__main__':
+    asyncio.run(stress())